@@ -0,0 +1,185 @@
+"""
+Controle de admissão das chamadas ao LLM
+- No máximo LLM_MAX_CONCURRENCY chamadas em andamento e LLM_MAX_QUEUE aguardando
+- Cada requisição tem prazo de REQUEST_TIMEOUT: com vaga livre começa na hora; se precisar
+  esperar e não der para começar a tempo, é recusada logo (503 + Retry-After) em vez de
+  gastar uma resposta que ninguém vai ler
+- Requisição cujo cliente desconectou é cancelada (libera a vaga e a chamada ao LLM)
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Dict, Optional, TypeVar
+
+from dotenv import load_dotenv
+from fastapi import Request
+
+from settings import settings
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+REQUEST_TIMEOUT = settings.request_timeout
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+
+# Frequência com que uma requisição em andamento verifica se o cliente ainda está lá
+DISCONNECT_POLL_INTERVAL = 0.5
+# Peso da última chamada na média móvel do tempo de serviço
+SERVICE_TIME_ALPHA = 0.2
+# Tempos de espera guardados para as estatísticas
+WAIT_SAMPLES = 1000
+
+T = TypeVar("T")
+
+class Overloaded(Exception):
+    """Requisição recusada por falta de capacidade; tentar de novo após retry_after segundos"""
+
+    def __init__(self, motivo: str, retry_after: int):
+        super().__init__(f"Servidor sobrecarregado ({motivo}); tente novamente em {retry_after}s")
+        self.motivo = motivo
+        self.retry_after = retry_after
+
+class ClientDisconnected(Exception):
+    """Cliente desconectou antes da resposta ficar pronta"""
+
+class AdmissionQueue:
+    """Fila limitada na frente do LLM, com descarte por prazo"""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_MAX_QUEUE,
+                 timeout: float = REQUEST_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        # Criado no primeiro slot(): no Python 3.9 o semáforo se prende ao loop da criação,
+        # e a fila é instanciada na importação de main.py, antes do loop do uvicorn
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.in_flight = 0
+        # Média móvel da duração das chamadas (None até a primeira terminar)
+        self.service_time: Optional[float] = None
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.counters = {"admitted": 0, "completed": 0, "failed": 0, "cancelled": 0,
+                         "rejected_queue_full": 0, "rejected_deadline": 0}
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def estimated_wait(self) -> float:
+        """Espera estimada para quem chegar agora (0 se houver vaga livre)"""
+        if self.in_flight < self.max_concurrency or self.service_time is None:
+            return 0.0
+        return (self.waiting + 1) / self.max_concurrency * self.service_time
+
+    def deadline_from_now(self) -> float:
+        """Prazo de uma requisição que chega agora (capturar na chegada, antes de outras esperas)"""
+        return time.monotonic() + self.timeout
+
+    def _reject(self, motivo: str, contador: str) -> Overloaded:
+        self.counters[contador] += 1
+        return Overloaded(motivo, max(1, math.ceil(self.estimated_wait())))
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """Ocupar uma vaga até o fim do bloco; Overloaded se não puder começar antes do prazo
+
+        `deadline` (time.monotonic) vem de deadline_from_now() na chegada; sem ele, conta a partir daqui.
+        """
+        chegada = time.monotonic()
+        if deadline is None:
+            deadline = chegada + self.timeout
+
+        if chegada >= deadline:
+            raise self._reject("prazo esgotado antes da fila", "rejected_deadline")
+
+        # Vaga livre: começa já, sem consultar a estimativa (que só serve para quem vai esperar)
+        if not self.semaphore.locked():
+            await self.semaphore.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                raise self._reject("fila cheia", "rejected_queue_full")
+            if chegada + self.estimated_wait() > deadline:
+                raise self._reject("prazo insuficiente", "rejected_deadline")
+
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), deadline - chegada)
+            except asyncio.TimeoutError:
+                raise self._reject("prazo esgotado na fila", "rejected_deadline")
+            except asyncio.CancelledError:
+                self.counters["cancelled"] += 1
+                raise
+            finally:
+                self.waiting -= 1
+
+        inicio = time.monotonic()
+        self.waits.append(inicio - chegada)
+        self.counters["admitted"] += 1
+        self.in_flight += 1
+        try:
+            yield
+            self.counters["completed"] += 1
+        except asyncio.CancelledError:
+            self.counters["cancelled"] += 1
+            raise
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+            # Limitada ao prazo: respostas longas não podem travar a estimativa acima dele
+            duracao = min(time.monotonic() - inicio, self.timeout)
+            self.service_time = duracao if self.service_time is None else (
+                SERVICE_TIME_ALPHA * duracao + (1 - SERVICE_TIME_ALPHA) * self.service_time
+            )
+
+    def stats(self) -> Dict:
+        """Profundidade da fila, vagas ocupadas e tempos de espera recentes"""
+        waits = sorted(self.waits)
+
+        def percentil(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 4) if waits else 0.0
+
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "limits": {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "request_timeout": self.timeout
+            },
+            "wait_seconds": {
+                "samples": len(waits),
+                "avg": round(sum(waits) / len(waits), 4) if waits else 0.0,
+                "p50": percentil(0.5),
+                "p95": percentil(0.95),
+                "max": round(waits[-1], 4) if waits else 0.0
+            },
+            "service_seconds_avg": round(self.service_time, 4) if self.service_time is not None else None,
+            "estimated_wait_seconds": round(self.estimated_wait(), 4),
+            **self.counters
+        }
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """Aguardar `awaitable`, cancelando-o se o cliente HTTP desconectar antes"""
+    tarefa = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            concluidas, _ = await asyncio.wait({tarefa}, timeout=DISCONNECT_POLL_INTERVAL)
+            if concluidas:
+                return tarefa.result()
+            if await request.is_disconnected():
+                tarefa.cancel()
+                raise ClientDisconnected()
+    finally:
+        # Handler cancelado (ex.: servidor encerrando): não deixar a chamada órfã
+        if not tarefa.done():
+            tarefa.cancel()
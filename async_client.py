@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Cliente assíncrono para conduzir muitas sessões de chat em paralelo
+Funciona com o servidor unificado (main.py na porta 8000, ou local_chat.py na 8001)
+Execute: poetry run python async_client.py [sessões] [url]
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime
+from typing import Optional, Set
+
+import httpx
+
+from client import CONNECT_TIMEOUT, POOL_SIZE, READ_TIMEOUT
+
+# Máximo de requisições simultâneas em andamento por cliente
+MAX_CONCURRENCY = 20
+
+class RequestCancelled(httpx.HTTPError):
+    """Requisição abortada por cancel_all(); quem a aguardava continua rodando"""
+
+class AsyncChatClient:
+    def __init__(self, base_url: str = "http://localhost:8000", max_concurrency: int = MAX_CONCURRENCY,
+                 pool_size: int = POOL_SIZE, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, engine: Optional[str] = None):
+        self.base_url = base_url
+        # Motor do servidor ("openai", "local", "auto"); None usa o padrão do servidor
+        self.engine = engine
+        self.session_id = f"async_session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.http = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending: Set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> "AsyncChatClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Cancelar requisições pendentes e fechar o pool de conexões"""
+        self.cancel_all()
+        await self.http.aclose()
+
+    def cancel_all(self):
+        """Cancelar as requisições em andamento ou na fila (a conexão volta ao pool)
+
+        Só as requisições são canceladas: quem as aguardava recebe RequestCancelled.
+        """
+        for task in list(self._pending):
+            task.cancel()
+
+    async def _limited(self, method: str, path: str, **kwargs) -> httpx.Response:
+        async with self.semaphore:
+            return await self.http.request(method, path, **kwargs)
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Requisição limitada pelo semáforo, em uma tarefa própria (fila + chamada)
+
+        cancel_all() cancela essa tarefa, não a de quem chamou; cancelar quem chamou cancela a requisição.
+        """
+        request = asyncio.ensure_future(self._limited(method, path, **kwargs))
+        self._pending.add(request)
+        try:
+            # wait() não propaga o cancelamento da requisição para quem chamou
+            await asyncio.wait({request})
+        except asyncio.CancelledError:
+            request.cancel()
+            raise
+        finally:
+            self._pending.discard(request)
+
+        if request.cancelled():
+            raise RequestCancelled(f"Requisição cancelada: {method} {path}")
+        return request.result()
+
+    async def send_message(self, message: str, session_id: Optional[str] = None) -> Optional[str]:
+        """Enviar mensagem para a API"""
+        if not session_id:
+            session_id = self.session_id
+
+        try:
+            payload = {
+                "message": message,
+                "session_id": session_id
+            }
+            if self.engine:
+                payload["engine"] = self.engine
+
+            response = await self._request("POST", "/chat", json=payload)
+
+            if response.status_code == 200:
+                data = response.json()
+                return data["response"]
+            else:
+                try:
+                    detalhe = response.json().get('detail', 'Erro desconhecido')
+                except ValueError:
+                    # Corpo não-JSON (ex.: página de erro de um proxy)
+                    detalhe = f"HTTP {response.status_code}"
+                print(f"❌ Erro da API: {detalhe}")
+                return None
+
+        except httpx.HTTPError as e:
+            print(f"❌ Erro ao enviar mensagem: {e}")
+            return None
+        except (ValueError, KeyError) as e:
+            print(f"❌ Resposta inválida da API: {e}")
+            return None
+
+    async def get_session_history(self, session_id: Optional[str] = None, since: int = 0,
+                                  limit: Optional[int] = None) -> Optional[dict]:
+        """Obter histórico da sessão (apenas mensagens com índice >= since)"""
+        if not session_id:
+            session_id = self.session_id
+
+        params = {"since": since}
+        if limit:
+            params["limit"] = limit
+
+        try:
+            response = await self._request("GET", f"/sessions/{session_id}/history", params=params)
+            if response.status_code == 200:
+                return response.json()
+            return None
+        except (httpx.HTTPError, ValueError):
+            return None
+
+    async def list_sessions(self) -> Optional[dict]:
+        """Listar todas as sessões"""
+        try:
+            response = await self._request("GET", "/sessions")
+            if response.status_code == 200:
+                return response.json()
+            return None
+        except (httpx.HTTPError, ValueError):
+            return None
+
+    async def clear_session(self, session_id: Optional[str] = None) -> bool:
+        """Limpar sessão"""
+        if not session_id:
+            session_id = self.session_id
+
+        try:
+            response = await self._request("DELETE", f"/sessions/{session_id}")
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+async def demo(total_sessions: int, base_url: str):
+    """Conduzir várias conversas em paralelo e medir o tempo total"""
+    mensagens = ["Olá!", "Quero ir para Florianópolis", "Somos 2 pessoas", "Quando é a melhor época?"]
+
+    async with AsyncChatClient(base_url) as client:
+        async def conversar(indice: int) -> int:
+            session_id = f"{client.session_id}_{indice}"
+            respostas = 0
+            for mensagem in mensagens:
+                if await client.send_message(mensagem, session_id):
+                    respostas += 1
+            await client.clear_session(session_id)
+            return respostas
+
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(conversar(i) for i in range(total_sessions)))
+        duracao = time.perf_counter() - inicio
+
+    print(f"✅ {sum(resultados)}/{total_sessions * len(mensagens)} respostas em {duracao:.2f}s "
+          f"({total_sessions} sessões em paralelo)")
+
+def main():
+    """Função principal"""
+    total_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    base_url = sys.argv[2] if len(sys.argv) > 2 else "http://localhost:8000"
+    asyncio.run(demo(total_sessions, base_url))
+
+if __name__ == "__main__":
+    main()
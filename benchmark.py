@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Benchmarks do assistente de viagem
+Execute: poetry run python benchmark.py [comando]
+"""
+
+import sys
+import time
+from typing import Callable
+
+def medir(nome: str, funcao: Callable[[int], None], iteracoes: int = 20000):
+    """Executar a função e imprimir a vazão em operações por segundo"""
+    inicio = time.perf_counter()
+    funcao(iteracoes)
+    duracao = time.perf_counter() - inicio
+    print(f"   {nome:<40} {iteracoes / duracao:>12,.0f} ops/s  ({duracao * 1e6 / iteracoes:.1f} µs/op)")
+
+def bench_local():
+    """Vazão de gerar_resposta_local para destinos e perguntas de época"""
+    import local_chat
+    import sessions
+
+    def rodar(mensagens):
+        def executar(iteracoes: int):
+            for i in range(iteracoes):
+                session_id = f"bench_{i % 100}"
+                local_chat.gerar_resposta_local(mensagens[i % len(mensagens)], session_id)
+        return executar
+
+    print("\n🏠 LOCAL ENGINE - gerar_resposta_local")
+    sessions.conversas.clear()
+    medir("destino (florianópolis / goiás)", rodar(["Quero ir para Florianópolis", "E goiás?"]))
+    medir("época (quando ir)", rodar(["Quando é a melhor época?"]))
+    medir("genérica", rodar(["Me ajuda a planejar"]))
+    medir("recarregar catálogo", lambda n: [local_chat.carregar_catalogo() for _ in range(n)], 2000)
+
+    vistos = set()
+    total = sum(conversa.memoria(vistos) for conversa in sessions.conversas.values())
+    print(f"   memória: {len(sessions.conversas)} sessões, {total:,} bytes ({total // len(sessions.conversas):,} bytes/sessão)")
+    sessions.conversas.clear()
+
+# Tabela de casos do extrator: mensagem -> entidades esperadas
+CASOS_ENTIDADES = [
+    ("Somos duas pessoas", {"pessoas": 2}),
+    ("Vamos em 4 para Florianópolis", {"pessoas": 4}),
+    ("Um casal, 5 dias em julho com R$ 3.500,00", {"pessoas": 2, "duracao": 5, "epoca": "julho", "orcamento": 3500.0}),
+    ("Viajo sozinha em dezembro", {"pessoas": 1, "epoca": "dezembro"}),
+    ("R$ 800 para três amigos", {"orcamento": 800.0, "pessoas": 3}),
+    ("2 mil reais por 1 semana", {"orcamento": 2000.0, "duracao": 7}),
+    ("Orçamento de R$2mil", {"orcamento": 2000.0}),
+    ("Fim de semana com 1500 reais", {"duracao": 2, "orcamento": 1500.0}),
+    ("Quero ir no verão, 3 noites", {"epoca": "verão", "duracao": 4}),
+    ("Dez dias na primavera", {"duracao": 10, "epoca": "primavera"}),
+    ("Nós 4", {"numero": 4}),
+    ("Somos um casal", {"pessoas": 2}),
+    ("Somos uma família de 5", {"pessoas": 5}),
+    ("Vamos em 2025 para Goiás", {}),
+    ("Em 2025, nós 3", {"numero": 3}),
+    ("Quero conhecer Goiás", {}),
+]
+
+def bench_entidades():
+    """Conferir a tabela de casos e medir o extrator de entidades"""
+    import local_chat
+
+    print("\n🔎 EXTRATOR DE ENTIDADES - extrair_entidades")
+    falhas = 0
+    for mensagem, esperado in CASOS_ENTIDADES:
+        obtido = local_chat.extrair_entidades(mensagem.lower())
+        if obtido != esperado:
+            falhas += 1
+            print(f"   ❌ {mensagem!r}: esperado {esperado}, obtido {obtido}")
+    print(f"   ✅ {len(CASOS_ENTIDADES) - falhas}/{len(CASOS_ENTIDADES)} casos corretos")
+
+    mensagens = [mensagem.lower() for mensagem, _ in CASOS_ENTIDADES]
+
+    def extrator(iteracoes: int):
+        for i in range(iteracoes):
+            local_chat.extrair_entidades(mensagens[i % len(mensagens)])
+
+    def apenas_numeros(iteracoes: int):
+        # Extração anterior: só números, com import dentro da função
+        for i in range(iteracoes):
+            import re
+            re.findall(r'\d+', mensagens[i % len(mensagens)])
+
+    medir("extrair_entidades (todas as entidades)", extrator, 100000)
+    medir("re.findall (apenas números, anterior)", apenas_numeros, 100000)
+
+    if falhas:
+        sys.exit(1)
+
+def iniciar_servidor_local(app=None):
+    """Subir o servidor unificado (ou `app`) em uma thread (porta livre) e retornar (servidor, url)"""
+    import socket
+    import threading
+    import uvicorn
+    if app is None:
+        import main
+        app = main.app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        porta = sock.getsockname()[1]
+
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=porta, log_level="warning"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.01)
+    return servidor, f"http://127.0.0.1:{porta}"
+
+def bench_http():
+    """Overhead por mensagem: requests avulso (nova conexão) x sessão com pool"""
+    import requests
+    from client import create_http_session
+
+    servidor, url = iniciar_servidor_local()
+    http = create_http_session()
+    payload = {"message": "Quero ir para Florianópolis", "session_id": "bench_http", "engine": "local"}
+
+    print("\n🌐 CLIENTE HTTP - overhead por mensagem (chat local)")
+    medir("requests.post (conexão nova)", lambda n: [requests.post(f"{url}/chat", json=payload, timeout=30) for _ in range(n)], 500)
+    medir("sessão com pool (keep-alive)", lambda n: [http.post(f"{url}/chat", json=payload, timeout=30) for _ in range(n)], 500)
+    medir("requests.get /health (conexão nova)", lambda n: [requests.get(f"{url}/health", timeout=5) for _ in range(n)], 500)
+    medir("sessão com pool /health", lambda n: [http.get(f"{url}/health", timeout=5) for _ in range(n)], 500)
+
+    servidor.should_exit = True
+
+def bench_serializacao():
+    """Tempo de codificação das respostas típicas em cada formato"""
+    import gzip
+    import json
+    from fastapi.encoders import jsonable_encoder
+    import local_chat
+    import serialization
+    import sessions
+
+    sessions.conversas.clear()
+    for mensagem in ["Olá!", "Quero ir para Florianópolis", "Somos 2 pessoas", "Quando ir?", "E goiás?"] * 10:
+        local_chat.gerar_resposta_local(mensagem, "bench_serializacao")
+    conversa = sessions.conversas["bench_serializacao"]
+    for i in range(200):
+        sessions.obter_conversa(f"bench_sessao_{i}")
+
+    respostas = {
+        "chat": {"response": conversa.mensagens[-1].content, "session_id": "bench_serializacao", "model_used": "local-assistant"},
+        "history (50 turnos)": {"session_id": "bench_serializacao", "messages": conversa.mensagens_desde(0),
+                                "total_messages": conversa.total_mensagens, "next_index": conversa.total_mensagens},
+        "sessions (200)": {"active_sessions": list(sessions.conversas), "total_sessions": len(sessions.conversas)},
+    }
+
+    codificadores = {
+        "FastAPI padrão (jsonable_encoder+json)": lambda c: json.dumps(jsonable_encoder(c), ensure_ascii=False, separators=(",", ":")).encode(),
+        "json.dumps": lambda c: json.dumps(c, ensure_ascii=False, separators=(",", ":")).encode(),
+    }
+    if serialization.orjson is not None:
+        codificadores["orjson"] = serialization.orjson.dumps
+    if serialization.msgpack is not None:
+        codificadores["msgpack"] = serialization.encode_msgpack
+
+    print("\n📦 SERIALIZAÇÃO - tempo de codificação")
+    for nome, conteudo in respostas.items():
+        corpo = serialization.encode_json(conteudo)
+        print(f"\n   {nome}: {len(corpo):,} bytes JSON")
+        for codificador, encode in codificadores.items():
+            medir(f"{codificador} ({len(encode(conteudo)):,} B)", lambda n: [encode(conteudo) for _ in range(n)], 2000)
+        medir(f"gzip nível {serialization.GZIP_LEVEL} ({len(gzip.compress(corpo, serialization.GZIP_LEVEL)):,} B)",
+              lambda n: [gzip.compress(corpo, serialization.GZIP_LEVEL) for _ in range(n)], 2000)
+        if "zstd" in serialization.COMPRESSORS:
+            zstd = serialization.COMPRESSORS["zstd"]
+            medir(f"zstd nível {serialization.ZSTD_LEVEL} ({len(zstd(corpo)):,} B)", lambda n: [zstd(corpo) for _ in range(n)], 2000)
+
+    sessions.conversas.clear()
+
+def criar_stub_llm(atraso_conexao: float):
+    """API compatível com a OpenAI (/v1/models e /v1/chat/completions em streaming)
+
+    A primeira requisição de cada conexão espera `atraso_conexao`, simulando DNS + TLS.
+    Retorna (app, portas dos clientes já vistos).
+    """
+    import asyncio
+    import json
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+    conexoes = set()
+
+    async def nova_conexao(request: Request):
+        porta = request.client.port
+        if porta not in conexoes:
+            conexoes.add(porta)
+            await asyncio.sleep(atraso_conexao)
+
+    @app.get("/v1/models")
+    async def models(request: Request):
+        await nova_conexao(request)
+        return {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model", "created": 0, "owned_by": "stub"}]}
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        await nova_conexao(request)
+        corpo = await request.json()
+
+        def chunk(delta: dict, finish_reason=None) -> str:
+            return "data: " + json.dumps({
+                "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": corpo["model"],
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }) + "\n\n"
+
+        def gerar():
+            yield chunk({"role": "assistant", "content": ""})
+            for parte in ["Olá", ", ", "viajante!"]:
+                yield chunk({"content": parte})
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(gerar(), media_type="text/event-stream")
+
+    return app, conexoes
+
+def bench_llm():
+    """Primeira chamada ao LLM com e sem aquecimento do pool (contra um stub local)"""
+    import asyncio
+    from langchain_openai import ChatOpenAI
+    from llm_http import create_llm_http_client, llm_timeout, warm_up
+
+    atraso_conexao = 0.2
+    stub, conexoes = criar_stub_llm(atraso_conexao)
+    servidor, url = iniciar_servidor_local(stub)
+    base_url = f"{url}/v1"
+
+    async def primeira_chamada(aquecer: bool) -> float:
+        client = create_llm_http_client()
+        if aquecer:
+            aquecimento = await warm_up(client, base_url, connections=2, api_key="sk-stub")
+            print(f"   aquecimento: {aquecimento['responses']}/{aquecimento['requested']} respostas "
+                  f"({', '.join(aquecimento['http_versions'])}) em {aquecimento['seconds']:.3f}s")
+        llm = ChatOpenAI(model="gpt-3.5-turbo", api_key="sk-stub", base_url=base_url,
+                         http_async_client=client, request_timeout=llm_timeout(), max_retries=0)
+        antes = len(conexoes)
+        inicio = time.perf_counter()
+        resposta = "".join([chunk.content async for chunk in llm.astream("Olá")])
+        duracao = time.perf_counter() - inicio
+        await client.aclose()
+        assert resposta == "Olá, viajante!", resposta
+        print(f"   {'com' if aquecer else 'sem'} aquecimento: primeira resposta em {duracao * 1000:.1f} ms "
+              f"({len(conexoes) - antes} conexão(ões) nova(s) durante a chamada)")
+        return duracao
+
+    print(f"\n🔥 LLM - primeira chamada após o deploy (stub local, {atraso_conexao * 1000:.0f} ms por conexão nova)")
+    fria = asyncio.run(primeira_chamada(aquecer=False))
+    quente = asyncio.run(primeira_chamada(aquecer=True))
+    print(f"   ganho do aquecimento: {(fria - quente) * 1000:.1f} ms")
+
+    servidor.should_exit = True
+
+# Limite de regressão: bytes retidos por sessão por turno (usuário + assistente)
+LIMITE_BYTES_POR_TURNO = 512
+
+def bench_memoria():
+    """Memória retida por sessão e por turno (tracemalloc), com limite de regressão"""
+    import gc
+    import tracemalloc
+    import local_chat
+    import memory_debug
+    import sessions
+
+    mensagens = ["Olá!", "Quero ir para Florianópolis", "Somos 2 pessoas", "Quando é a melhor época?",
+                 "E goiás?", "5 dias em julho com R$ 3.000", "Me ajuda a planejar"]
+    # Sem despejo (MAX_SESSIONS) e sem corte do histórico (MAX_HISTORY_MESSAGES, 2 mensagens por turno)
+    total_sessoes = min(200, sessions.MAX_SESSIONS)
+    abaixo_do_limite = max(1, sessions.MAX_HISTORY_MESSAGES // 2 - 1)
+    falhas = 0
+
+    print(f"\n🧠 MEMÓRIA - bytes retidos por sessão ({total_sessoes} sessões, motor local)")
+    tracemalloc.start()
+    for turnos in sorted({1, min(10, abaixo_do_limite), abaixo_do_limite, sessions.MAX_HISTORY_MESSAGES}):
+        sessions.conversas.clear()
+        gc.collect()
+        antes = tracemalloc.get_traced_memory()[0]
+        for i in range(total_sessoes):
+            for turno in range(turnos):
+                local_chat.gerar_resposta_local(mensagens[turno % len(mensagens)], f"bench_memoria_{i}")
+        gc.collect()
+        retidos = tracemalloc.get_traced_memory()[0] - antes
+        profundo = memory_debug.resumo_sessoes(0)["deep_size_bytes"]
+        retidas = len(sessions.conversas)
+
+        por_sessao = retidos / retidas
+        if turnos > abaixo_do_limite:
+            # Histórico cortado: o custo por turno não se aplica
+            print(f"   {turnos:>3} turnos: {por_sessao:>10,.0f} bytes/sessão  (histórico no limite de "
+                  f"{sessions.MAX_HISTORY_MESSAGES} mensagens; estimativa profunda: {profundo / retidas:,.0f} bytes/sessão)")
+            continue
+        por_turno = por_sessao / turnos
+        print(f"   {turnos:>3} turnos: {por_sessao:>10,.0f} bytes/sessão  {por_turno:>8,.0f} bytes/sessão/turno  "
+              f"(estimativa profunda: {profundo / retidas:,.0f} bytes/sessão)")
+        if turnos > 1 and por_turno > LIMITE_BYTES_POR_TURNO:
+            falhas += 1
+            print(f"   ❌ acima do limite de {LIMITE_BYTES_POR_TURNO:,} bytes/sessão/turno")
+    tracemalloc.stop()
+    sessions.conversas.clear()
+
+    if falhas:
+        sys.exit(1)
+
+def bench_historico():
+    """Histórico em dois níveis: compressão dos turnos antigos e custo de leitura"""
+    import random
+    import local_chat
+    import sessions
+
+    # Respostas únicas de vários KB, como os roteiros gerados pelo LLM
+    rng = random.Random(42)
+    destinos = list(local_chat.DESTINOS_BRASIL.items())
+
+    def roteiro(turno: int) -> str:
+        nome, info = rng.choice(destinos)
+        dias = [f"**Dia {dia}:** {rng.choice(info['atrações'])} pela manhã, {rng.choice(info['atrações'])} à tarde. "
+                f"{rng.choice(info['dicas'])} Orçamento estimado: R$ {rng.randint(80, 900)},00."
+                for dia in range(1, rng.randint(5, 12))]
+        return f"🗺️ Roteiro {turno} em {nome.title()}\n\n{info['descricao']}\n\n" + "\n".join(dias)
+
+    total_sessoes = 50
+    sessions.conversas.clear()
+    for i in range(total_sessoes):
+        conversa = sessions.obter_conversa(f"bench_historico_{i}")
+        for turno in range(sessions.MAX_HISTORY_MESSAGES // 2):
+            conversa.adicionar("user", f"Me sugira um roteiro de {rng.randint(3, 10)} dias (pedido {turno})")
+            conversa.adicionar("assistant", roteiro(turno))
+
+    compressoes = [conversa.compressao() for conversa in sessions.conversas.values()]
+    original = sum(c["original_bytes"] for c in compressoes)
+    comprimido = sum(c["compressed_bytes"] for c in compressoes)
+    economizado = sum(c["saved_bytes"] for c in compressoes)
+    memoria = sum(conversa.memoria() for conversa in sessions.conversas.values())
+
+    codec = "zstd" if sessions.zstandard is not None else "zlib"
+    print(f"\n🗜️ HISTÓRICO - {total_sessoes} sessões com {sessions.MAX_HISTORY_MESSAGES} mensagens "
+          f"({sessions.HOT_HISTORY_MESSAGES} recentes, blocos de {sessions.HISTORY_BLOCK_MESSAGES}, {codec})")
+    print(f"   antigas: {original / total_sessoes:,.0f} -> {comprimido / total_sessoes:,.0f} bytes/sessão "
+          f"(taxa {original / comprimido:.1f}x)")
+    print(f"   economia: {economizado / total_sessoes:,.0f} bytes/sessão; "
+          f"memória atual {memoria / total_sessoes:,.0f} bytes/sessão")
+
+    conversa = sessions.conversas["bench_historico_0"]
+    medir("recentes() (prompt do LLM)", lambda n: [conversa.recentes() for _ in range(n)], 20000)
+    medir("mensagens_desde(next_index - 2)", lambda n: [conversa.mensagens_desde(conversa.total_mensagens - 2) for _ in range(n)], 20000)
+    medir("mensagens_desde(0) (histórico completo)", lambda n: [conversa.mensagens_desde(0) for _ in range(n)], 2000)
+
+    sessions.conversas.clear()
+
+BENCHMARKS = {
+    "local": bench_local,
+    "entidades": bench_entidades,
+    "http": bench_http,
+    "serializacao": bench_serializacao,
+    "llm": bench_llm,
+    "memoria": bench_memoria,
+    "historico": bench_historico,
+}
+
+def main():
+    """Função principal"""
+    comandos = sys.argv[1:] or list(BENCHMARKS)
+
+    for comando in comandos:
+        if comando not in BENCHMARKS:
+            print(f"❌ Benchmark desconhecido: {comando}")
+            print(f"💡 Disponíveis: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[comando]()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Respostas JSON pré-serializadas com ETag forte
+Usado pelos endpoints de conteúdo quase estático (/, /info, /health, /destinations)
+"""
+
+import hashlib
+import json
+from typing import Any
+
+from fastapi import Request, Response
+
+class CachedJSON:
+    """Corpo JSON serializado uma única vez, servido com ETag e 304"""
+
+    def __init__(self, conteudo: Any, cache_control: str = "no-cache"):
+        self.cache_control = cache_control
+        self.atualizar(conteudo)
+
+    def atualizar(self, conteudo: Any):
+        """Regenerar corpo e ETag (chamar quando catálogo ou configuração mudar)"""
+        # Mesma serialização do JSONResponse do FastAPI
+        self.corpo = json.dumps(conteudo, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{hashlib.sha256(self.corpo).hexdigest()[:32]}"'
+        self.headers = {"ETag": self.etag, "Cache-Control": self.cache_control}
+
+    def nao_modificado(self, if_none_match: str) -> bool:
+        """Verificar se o cliente já tem a versão atual (If-None-Match)"""
+        if if_none_match.strip() == "*":
+            return True
+        # Comparação fraca, como manda a RFC 9110 para If-None-Match
+        return any(etag.strip().removeprefix("W/") == self.etag for etag in if_none_match.split(","))
+
+    def responder(self, request: Request) -> Response:
+        """Responder 304 se o ETag bater, ou o corpo pré-serializado"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and self.nao_modificado(if_none_match):
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.corpo, media_type="application/json", headers=self.headers)
@@ -4,8 +4,8 @@ Cliente simples para chat rápido
 Execute: poetry run python chat.py
 """
 
-import requests
 import json
+from client import ChatSocket, ChatSocketClosed, ChatSocketError, create_http_session
 
 def chat_simples():
     """Chat simples e direto"""
@@ -14,6 +14,9 @@ def chat_simples():
     
     session_id = "quick_chat"
     base_url = "http://localhost:8000"
+    http = create_http_session()
+    # WebSocket quando o servidor oferecer; senão um POST por mensagem
+    socket = ChatSocket.open(base_url, session_id)
     
     while True:
         try:
@@ -27,13 +30,29 @@ def chat_simples():
             if not mensagem:
                 continue
             
+            # Enviar pelo WebSocket (streaming)
+            if socket and not socket.closed:
+                try:
+                    print("🤖: ", end="", flush=True)
+                    partes = []
+                    resposta = socket.send_message(mensagem, on_chunk=lambda parte: (
+                        partes.append(parte), print(parte, end="", flush=True)
+                    ))
+                    print("\n" if partes else f"{resposta}\n")
+                    continue
+                except ChatSocketError:
+                    print("❌ Erro na API. Verifique se o servidor está rodando.\n")
+                    continue
+                except ChatSocketClosed:
+                    print("\r", end="")  # Canal caiu antes do envio: seguir por HTTP
+            
             # Enviar para API
             payload = {
                 "message": mensagem,
                 "session_id": session_id
             }
             
-            response = requests.post(f"{base_url}/chat", json=payload, timeout=30)
+            response = http.post(f"{base_url}/chat", json=payload, timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
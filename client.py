@@ -6,21 +6,176 @@ Execute: poetry run python client.py
 
 import requests
 import json
+import random
 import sys
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Dict, Optional
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+# MessagePack é opcional: sem ele o cliente pede JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# WebSocket é opcional: sem a biblioteca o cliente usa só HTTP
+try:
+    from websockets.exceptions import WebSocketException
+    from websockets.sync.client import connect as ws_connect
+except ImportError:
+    ws_connect = None
+    WebSocketException = OSError
+
+# Configuração padrão do pool HTTP dos clientes
+POOL_SIZE = 10
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 30
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+
+class JitterRetry(Retry):
+    """Retry exponencial com jitter completo (evita rajadas sincronizadas)"""
+    
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff else 0
+
+def create_http_session(pool_size: int = POOL_SIZE, retries: int = MAX_RETRIES,
+                        backoff_factor: float = BACKOFF_FACTOR) -> requests.Session:
+    """Criar sessão HTTP com keep-alive, pool de conexões e retry para métodos idempotentes"""
+    retry = JitterRetry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # POST /chat nunca é repetido
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    
+    http = requests.Session()
+    http.mount("http://", adapter)
+    http.mount("https://", adapter)
+    return http
+
+def decode_response(response: requests.Response):
+    """Decodificar corpo JSON ou MessagePack conforme o Content-Type"""
+    if msgpack is not None and "msgpack" in response.headers.get("content-type", ""):
+        return msgpack.unpackb(response.content, raw=False)
+    return response.json()
+
+class ChatSocketError(Exception):
+    """Erro informado pelo servidor no canal WebSocket"""
+
+class ChatSocketClosed(Exception):
+    """Canal WebSocket fechado antes do envio (seguro reenviar por HTTP)"""
+
+class ChatSocket:
+    """Canal WebSocket persistente com /ws/chat (sessão fixada na conexão)"""
+    
+    def __init__(self, connection, session_id: str, read_timeout: float = READ_TIMEOUT):
+        self.connection = connection
+        self.session_id = session_id
+        self.read_timeout = read_timeout
+        self.closed = False
+    
+    @classmethod
+    def open(cls, base_url: str, session_id: str, connect_timeout: float = CONNECT_TIMEOUT,
+             read_timeout: float = READ_TIMEOUT, engine: Optional[str] = None) -> Optional["ChatSocket"]:
+        """Abrir o canal; None se o servidor (ou a biblioteca) não suportar WebSocket"""
+        if ws_connect is None:
+            return None
+        
+        url = base_url.replace("http", "ws", 1) + f"/ws/chat?session_id={quote(session_id)}"
+        if engine:
+            url += f"&engine={quote(engine)}"
+        try:
+            connection = ws_connect(url, open_timeout=connect_timeout)
+            hello = json.loads(connection.recv(timeout=connect_timeout))
+        except (OSError, TimeoutError, WebSocketException, ValueError):
+            return None
+        return cls(connection, hello.get("session_id", session_id), read_timeout)
+    
+    def send_message(self, message: str, on_chunk: Optional[Callable[[str], None]] = None) -> str:
+        """Enviar mensagem e aguardar a resposta completa (partes vão para on_chunk)
+        
+        ChatSocketClosed: canal caiu antes do envio (seguro reenviar por HTTP).
+        ChatSocketError: erro informado pelo servidor.
+        """
+        try:
+            self.connection.send(json.dumps({"message": message}, ensure_ascii=False))
+        except (OSError, WebSocketException) as e:
+            self.close()
+            raise ChatSocketClosed(str(e))
+        
+        try:
+            while True:
+                data = json.loads(self.connection.recv(timeout=self.read_timeout))
+                if data["type"] == "chunk" and on_chunk:
+                    on_chunk(data["content"])
+                elif data["type"] == "response":
+                    return data["response"]
+                elif data["type"] == "error":
+                    raise ChatSocketError(data["detail"])
+        except (OSError, TimeoutError, WebSocketException, ValueError) as e:
+            # Resposta pode chegar atrasada: o canal não serve mais para a próxima mensagem
+            self.close()
+            raise ChatSocketError(f"Canal WebSocket interrompido: {e}")
+    
+    def close(self):
+        self.closed = True
+        try:
+            self.connection.close()
+        except (OSError, WebSocketException):
+            pass
 
 class ChatClient:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(self, base_url: str = "http://localhost:8000", pool_size: int = POOL_SIZE,
+                 connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 retries: int = MAX_RETRIES, use_msgpack: bool = True, use_websocket: bool = True,
+                 engine: Optional[str] = None):
         self.base_url = base_url
+        # Motor do servidor ("openai", "local", "auto"); None usa o padrão do servidor
+        self.engine = engine
         self.session_id = f"terminal_session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.http = create_http_session(pool_size, retries)
+        # Respostas em MessagePack quando disponível, comprimidas com o que o urllib3 decodifica
+        self.http.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        if use_msgpack and msgpack is not None:
+            self.http.headers["Accept"] = "application/msgpack, application/json;q=0.9"
+        self.timeout = (connect_timeout, read_timeout)
+        # Histórico já baixado por sessão (sincronizado de forma incremental)
+        self.history_cache: Dict[str, dict] = {}
+        self.use_websocket = use_websocket
+        self.socket: Optional[ChatSocket] = None
+        
+    def connect_websocket(self) -> bool:
+        """Abrir o canal WebSocket da sessão atual (se o servidor oferecer)"""
+        if self.use_websocket and not self.socket:
+            self.socket = ChatSocket.open(self.base_url, self.session_id, *self.timeout, engine=self.engine)
+        return self.socket is not None
+    
+    def send_via_socket(self, message: str, on_chunk: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Enviar pelo WebSocket; ChatSocketClosed se for preciso usar HTTP"""
+        try:
+            return self.socket.send_message(message, on_chunk)
+        except ChatSocketClosed:
+            self.socket = None
+            raise
+        except ChatSocketError as e:
+            if self.socket.closed:
+                self.socket = None
+            print(f"❌ Erro da API: {e}")
+            return None
         
     def check_api_health(self) -> bool:
         """Verificar se a API está rodando"""
         try:
-            response = requests.get(f"{self.base_url}/health", timeout=5)
+            response = self.http.get(f"{self.base_url}/health", timeout=(self.timeout[0], 5))
             if response.status_code == 200:
-                data = response.json()
+                data = decode_response(response)
                 print(f"✅ API está online - Status: {data['status']}")
                 return True
             else:
@@ -31,28 +186,37 @@ class ChatClient:
             print("   Verifique se o servidor está rodando em http://localhost:8000")
             return False
     
-    def send_message(self, message: str, session_id: Optional[str] = None) -> Optional[str]:
-        """Enviar mensagem para a API"""
+    def send_message(self, message: str, session_id: Optional[str] = None,
+                     on_chunk: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Enviar mensagem para a API (pelo WebSocket, se conectado à mesma sessão)"""
         if not session_id:
             session_id = self.session_id
+        
+        if self.socket and session_id == self.socket.session_id:
+            try:
+                return self.send_via_socket(message, on_chunk)
+            except ChatSocketClosed:
+                pass  # Canal caiu antes do envio: seguir por HTTP
             
         try:
             payload = {
                 "message": message,
                 "session_id": session_id
             }
+            if self.engine:
+                payload["engine"] = self.engine
             
-            response = requests.post(
+            response = self.http.post(
                 f"{self.base_url}/chat",
                 json=payload,
-                timeout=30
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
-                data = response.json()
+                data = decode_response(response)
                 return data["response"]
             else:
-                error_data = response.json()
+                error_data = decode_response(response)
                 print(f"❌ Erro da API: {error_data.get('detail', 'Erro desconhecido')}")
                 return None
                 
@@ -60,26 +224,58 @@ class ChatClient:
             print(f"❌ Erro ao enviar mensagem: {e}")
             return None
     
-    def get_session_history(self, session_id: Optional[str] = None) -> Optional[dict]:
-        """Obter histórico da sessão"""
+    def get_session_history(self, session_id: Optional[str] = None, since: int = 0,
+                            limit: Optional[int] = None) -> Optional[dict]:
+        """Obter histórico da sessão (apenas mensagens com índice >= since)"""
         if not session_id:
             session_id = self.session_id
+        
+        params = {"since": since}
+        if limit:
+            params["limit"] = limit
             
         try:
-            response = requests.get(f"{self.base_url}/sessions/{session_id}/history")
+            response = self.http.get(f"{self.base_url}/sessions/{session_id}/history", params=params, timeout=self.timeout)
             if response.status_code == 200:
-                return response.json()
+                return decode_response(response)
             else:
                 return None
         except requests.exceptions.RequestException:
             return None
     
+    def sync_session_history(self, session_id: Optional[str] = None) -> Optional[dict]:
+        """Atualizar o histórico em cache baixando só as mensagens novas"""
+        if not session_id:
+            session_id = self.session_id
+        
+        cache = self.history_cache.get(session_id, {"messages": [], "next_index": 0})
+        history = self.get_session_history(session_id, since=cache["next_index"])
+        
+        # Sessão reiniciada no servidor (limpa ou despejada): baixar tudo de novo
+        if history and history.get("next_index", 0) < cache["next_index"]:
+            cache = {"messages": [], "next_index": 0}
+            history = self.get_session_history(session_id)
+        
+        if history is None:
+            self.history_cache.pop(session_id, None)
+            return None
+        
+        cache["messages"].extend(history["messages"])
+        cache["next_index"] = history.get("next_index", len(cache["messages"]))
+        self.history_cache[session_id] = cache
+        
+        return {
+            "session_id": session_id,
+            "messages": cache["messages"],
+            "total_messages": history["total_messages"]
+        }
+    
     def list_sessions(self) -> Optional[dict]:
         """Listar todas as sessões"""
         try:
-            response = requests.get(f"{self.base_url}/sessions")
+            response = self.http.get(f"{self.base_url}/sessions", timeout=self.timeout)
             if response.status_code == 200:
-                return response.json()
+                return decode_response(response)
             return None
         except requests.exceptions.RequestException:
             return None
@@ -89,8 +285,10 @@ class ChatClient:
         if not session_id:
             session_id = self.session_id
             
+        self.history_cache.pop(session_id, None)
+        
         try:
-            response = requests.delete(f"{self.base_url}/sessions/{session_id}")
+            response = self.http.delete(f"{self.base_url}/sessions/{session_id}", timeout=self.timeout)
             return response.status_code == 200
         except requests.exceptions.RequestException:
             return False
@@ -101,6 +299,8 @@ class ChatClient:
         print("🤖 CHAT INTELIGENTE - ASSISTENTE DE VIAGEM")
         print("=" * 60)
         print(f"📱 Sessão: {self.session_id}")
+        if self.connect_websocket():
+            print("⚡ Canal WebSocket ativo")
         print("💡 Comandos especiais:")
         print("   /help     - Mostrar ajuda")
         print("   /history  - Ver histórico da conversa")
@@ -133,12 +333,15 @@ class ChatClient:
                         print("❌ Comando não reconhecido. Digite /help para ver os comandos.")
                     continue
                 
-                # Enviar mensagem para a API
+                # Enviar mensagem para a API (partes em streaming já são impressas)
                 print("🤖 Assistente: ", end="", flush=True)
-                response = self.send_message(user_input)
+                streamed = []
+                response = self.send_message(user_input, on_chunk=lambda chunk: (
+                    streamed.append(chunk), print(chunk, end="", flush=True)
+                ))
                 
                 if response:
-                    print(response)
+                    print() if streamed else print(response)
                 else:
                     print("❌ Erro ao processar sua mensagem. Tente novamente.")
                     
@@ -162,12 +365,14 @@ class ChatClient:
     def show_history(self):
         """Mostrar histórico da sessão"""
         print(f"\n📜 HISTÓRICO DA SESSÃO: {self.session_id}")
-        history = self.get_session_history()
+        history = self.sync_session_history()
         
         if history and history.get('messages'):
-            for i, msg in enumerate(history['messages'], 1):
-                role = "🧑 Você" if "Human" in msg['type'] else "🤖 Assistente"
-                print(f"{i:2d}. {role}: {msg['content']}")
+            for msg in history['messages']:
+                # main.py informa o tipo da mensagem LangChain; local_chat.py, o papel
+                is_user = "Human" in msg.get('type', '') or msg.get('role') == 'user'
+                role = "🧑 Você" if is_user else "🤖 Assistente"
+                print(f"{msg['index'] + 1:2d}. {role}: {msg['content']}")
             print(f"\nTotal de mensagens: {history['total_messages']}")
         else:
             print("   (Nenhuma mensagem na sessão atual)")
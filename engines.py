@@ -0,0 +1,135 @@
+"""
+Motores de chat plugáveis do servidor unificado (main.py)
+- "openai": LangChain + OpenAI
+- "local":  base de conhecimento local (local_chat.py), sem APIs externas
+- "auto":   OpenAI quando configurada, senão local
+
+Os dois motores leem e gravam no mesmo armazenamento de sessões (sessions.py),
+então trocar de motor no meio da conversa não perde o histórico.
+"""
+
+import os
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from admission import AdmissionQueue
+from local_chat import gerar_resposta_local
+from sessions import Conversa, conversas, obter_conversa
+from settings import Settings, settings
+
+ENGINE_NAMES = ("openai", "local", "auto")
+
+# Motor usado quando nem a requisição nem a sessão escolhem um
+DEFAULT_ENGINE = settings.default_engine
+
+class ChatEngine:
+    """Interface dos motores: gerar a resposta em partes e gravar o turno na sessão
+
+    `overrides` traz ajustes por requisição ("model", "temperature", "max_tokens") e `deadline`
+    (time.monotonic) o prazo contado desde a chegada da requisição; motores que não usam LLM os ignoram.
+    """
+    name = ""
+    model_used = ""
+
+    def available(self) -> bool:
+        return True
+
+    def model_for(self, overrides: Optional[Dict] = None) -> str:
+        return self.model_used
+
+    async def stream(self, message: str, session_id: str, overrides: Optional[Dict] = None,
+                     deadline: Optional[float] = None) -> AsyncIterator[str]:
+        raise NotImplementedError
+        yield
+
+    async def respond(self, message: str, session_id: str, overrides: Optional[Dict] = None,
+                      deadline: Optional[float] = None) -> str:
+        return "".join([parte async for parte in self.stream(message, session_id, overrides, deadline)])
+
+class LocalEngine(ChatEngine):
+    name = "local"
+    model_used = "local-assistant"
+
+    async def stream(self, message: str, session_id: str, overrides: Optional[Dict] = None,
+                     deadline: Optional[float] = None) -> AsyncIterator[str]:
+        yield gerar_resposta_local(message, session_id)
+
+def langchain_history(conversa: Conversa) -> List[BaseMessage]:
+    """Converter o histórico recente da sessão em mensagens do LangChain (sem descomprimir os antigos)"""
+    return [
+        HumanMessage(content=mensagem.content) if mensagem.role == "user" else AIMessage(content=mensagem.content)
+        for mensagem in conversa.recentes()
+    ]
+
+class OpenAIEngine(ChatEngine):
+    name = "openai"
+
+    def __init__(self, chain_factory: Callable[[str, float, int], Any], settings: Settings,
+                 admission: Optional[AdmissionQueue] = None):
+        # chain_factory(modelo, temperatura, max_tokens) -> chain (com cache no chamador)
+        self.chain_factory = chain_factory
+        self.settings = settings
+        self.model_used = settings.model_name
+        # Fila de admissão na frente do LLM (None: sem limite)
+        self.admission = admission
+
+    def available(self) -> bool:
+        return bool(os.getenv("OPENAI_API_KEY"))
+
+    def llm_params(self, overrides: Optional[Dict] = None) -> Tuple[str, float, int]:
+        """(modelo, temperatura, max_tokens): ajustes da requisição sobre os padrões"""
+        overrides = overrides or {}
+        return (
+            overrides.get("model") or self.settings.model_name,
+            overrides.get("temperature", self.settings.temperature),
+            overrides.get("max_tokens", self.settings.max_tokens),
+        )
+
+    def model_for(self, overrides: Optional[Dict] = None) -> str:
+        return self.llm_params(overrides)[0]
+
+    async def stream(self, message: str, session_id: str, overrides: Optional[Dict] = None,
+                     deadline: Optional[float] = None) -> AsyncIterator[str]:
+        if not self.available():
+            raise RuntimeError("OPENAI_API_KEY não configurada. Adicione no arquivo .env")
+
+        chain = self.chain_factory(*self.llm_params(overrides))
+        conversa = obter_conversa(session_id)
+        partes = []
+        # Overloaded se não houver vaga a tempo; cancelamento libera a vaga e a chamada
+        async with self.admission.slot(deadline) if self.admission else nullcontext():
+            async for chunk in chain.astream({"input": message, "history": langchain_history(conversa)}):
+                if chunk.content:
+                    partes.append(chunk.content)
+                    yield chunk.content
+
+        # Turno gravado só depois de uma resposta completa
+        conversa.adicionar("user", message)
+        conversa.adicionar("assistant", "".join(partes))
+
+engines: Dict[str, ChatEngine] = {}
+
+def register_engine(engine: ChatEngine):
+    engines[engine.name] = engine
+
+def select_engine(session_id: str, requested: Optional[str] = None) -> ChatEngine:
+    """Resolver o motor: requisição > escolha da sessão > DEFAULT_ENGINE
+
+    Não cria nem altera a sessão: quem chama confere available() e só então usa fixar_engine.
+    """
+    conversa = conversas.get(session_id)
+    name = requested or (conversa.engine if conversa is not None else None) or DEFAULT_ENGINE
+
+    if name == "auto":
+        openai = engines.get("openai")
+        return openai if openai is not None and openai.available() else engines["local"]
+    return engines[name]
+
+def fixar_engine(session_id: str, requested: Optional[str] = None):
+    """Motor pedido explicitamente passa a valer para as próximas mensagens da sessão"""
+    if requested:
+        obter_conversa(session_id).engine = requested
+
+register_engine(LocalEngine())
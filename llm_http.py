@@ -0,0 +1,82 @@
+"""
+Cliente HTTP compartilhado pelas chamadas ao LLM (OpenAI)
+- Pool de conexões com keep-alive, HTTP/2 opcional (requer o pacote h2) e timeouts explícitos
+- Aquecimento na inicialização: abre as conexões (DNS, TCP, TLS) antes do servidor ficar pronto
+- OPENAI_API_BASE aponta para outro servidor (ex.: um stub local para testes)
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from settings import settings
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE") or "https://api.openai.com/v1"
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", str(LLM_POOL_SIZE)))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() in ("1", "true", "yes")
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "3.05"))
+# Leitura limitada ao prazo da requisição, salvo configuração explícita
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT") or settings.request_timeout)
+# Conexões abertas no aquecimento (0 desliga)
+LLM_WARMUP_CONNECTIONS = int(os.getenv("LLM_WARMUP_CONNECTIONS", "2"))
+
+# HTTP/2 só com o pacote h2 instalado; sem ele, HTTP/1.1 com keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+def llm_timeout() -> httpx.Timeout:
+    """Timeouts das chamadas ao LLM (conexão curta, leitura longa para respostas em streaming)"""
+    return httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+def create_llm_http_client(pool_size: int = LLM_POOL_SIZE,
+                           keepalive_connections: int = LLM_KEEPALIVE_CONNECTIONS,
+                           keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY,
+                           http2: bool = LLM_HTTP2) -> httpx.AsyncClient:
+    """Cliente assíncrono com pool ajustado, compartilhado por todas as instâncias do LLM"""
+    return httpx.AsyncClient(
+        http2=http2 and HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=llm_timeout()
+    )
+
+async def warm_up(client: httpx.AsyncClient, base_url: str = OPENAI_API_BASE,
+                  connections: int = LLM_WARMUP_CONNECTIONS, api_key: Optional[str] = None) -> Dict:
+    """Abrir `connections` conexões com o servidor do LLM e deixá-las no pool
+
+    Qualquer resposta HTTP (mesmo 401) conta: o que importa é DNS, TCP e TLS prontos.
+    GET /models não gera cobrança.
+    """
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    inicio = time.perf_counter()
+
+    async def abrir() -> Optional[httpx.Response]:
+        try:
+            return await client.get(f"{base_url.rstrip('/')}/models", headers=headers)
+        except httpx.HTTPError:
+            return None
+
+    # Requisições simultâneas: cada uma precisa de uma conexão própria
+    respostas = [r for r in await asyncio.gather(*(abrir() for _ in range(connections))) if r is not None]
+    return {
+        "base_url": base_url,
+        "responses": len(respostas),
+        "requested": connections,
+        "http_versions": sorted({r.http_version for r in respostas}),
+        "seconds": round(time.perf_counter() - inicio, 4)
+    }
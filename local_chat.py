@@ -1,30 +1,24 @@
 """
-Chat local que funciona sem API externa
+Motor de chat local que funciona sem API externa
 Para usar quando a quota da OpenAI acabar
-Execute: poetry run python local_chat.py
+Execute: poetry run python local_chat.py (servidor unificado com o motor local como padrão)
 """
 
+import argparse
+import json
+import multiprocessing
+import os
+import queue
 import random
+import re
+import sys
+import time
 import uvicorn
-from datetime import datetime
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import zlib
+from collections import Counter
 from typing import Optional, Dict, List
-
-app = FastAPI(
-    title="Chat Local - Assistente de Viagem",
-    description="Versão local que funciona sem APIs externas",
-    version="1.0.0"
-)
-
-class ChatRequest(BaseModel):
-    message: str
-    session_id: Optional[str] = "default_session"
-
-class ChatResponse(BaseModel):
-    response: str
-    session_id: str
-    model_used: str
+from cached_response import CachedJSON
+from sessions import obter_conversa
 
 # Base de conhecimento local sobre viagens
 DESTINOS_BRASIL = {
@@ -109,8 +103,66 @@ DICAS_GERAIS = [
     "📸 Reserve um tempinho para simplesmente curtir, sem fotos!"
 ]
 
-# Armazenar conversas
-conversas: Dict[str, Dict] = {}
+# Palavras que identificam dicas ligadas à época da viagem
+PALAVRAS_EPOCA = ('época', 'temporada', 'maio', 'setembro', 'verão', 'inverno')
+
+# Pergunta final da resposta de destino, conforme faltam (pessoas, duração)
+PERGUNTAS_DESTINO = {
+    (True, True): "Agora me conte: quantas pessoas vão viajar? E qual é a duração pretendida da viagem?",
+    (True, False): "Agora me conte: quantas pessoas vão viajar?",
+    (False, True): "Agora me conte: qual é a duração pretendida da viagem?",
+    (False, False): "Quer que eu monte um roteiro com essas informações?"
+}
+
+# Fragmentos pré-renderizados do catálogo (refeitos em carregar_catalogo)
+respostas_destino: Dict[str, Dict[tuple, str]] = {}
+respostas_epoca: Dict[str, str] = {}
+destinations_response = CachedJSON({}, cache_control="public, max-age=300")
+
+def _lista_markdown(itens: List[str]) -> str:
+    """Renderizar lista de itens no formato usado nas respostas"""
+    return f"• {chr(10) + '• '.join(itens)}\n\n"
+
+def carregar_catalogo(destinos: Optional[Dict[str, Dict]] = None):
+    """Carregar (ou recarregar) o catálogo e pré-renderizar as respostas fixas"""
+    global DESTINOS_BRASIL
+    if destinos is not None:
+        DESTINOS_BRASIL = destinos
+    
+    respostas_destino.clear()
+    respostas_epoca.clear()
+    
+    for destino, info in DESTINOS_BRASIL.items():
+        corpo = "".join([
+            f"🎯 Excelente escolha! {info['descricao']}!\n\n",
+            "🏞️ **Principais atrações:**\n", _lista_markdown(info['atrações']),
+            "🏨 **Opções de hospedagem:**\n", _lista_markdown(info['hospedagem']),
+            "🍽️ **Gastronomia local:**\n", _lista_markdown(info['gastronomia']),
+            "💡 **Dicas importantes:**\n", _lista_markdown(info['dicas'])
+        ])
+        respostas_destino[destino] = {faltam: corpo + pergunta for faltam, pergunta in PERGUNTAS_DESTINO.items()}
+        
+        dicas_epoca = [dica for dica in info['dicas'] if any(palavra in dica.lower() for palavra in PALAVRAS_EPOCA)]
+        respostas_epoca[destino] = "".join([
+            f"\n\nPara **{destino.title()}**:\n",
+            _lista_markdown(dicas_epoca) if dicas_epoca else "",
+            "Você já tem uma data específica em mente?"
+        ])
+    
+    destinos = [
+        {
+            "nome": nome.title(),
+            "descricao": info["descricao"],
+            "total_atracoes": len(info["atrações"])
+        }
+        for nome, info in DESTINOS_BRASIL.items()
+    ]
+    destinations_response.atualizar({
+        "total_destinations": len(destinos),
+        "destinations": destinos
+    })
+
+carregar_catalogo()
 
 def detectar_contexto(mensagem: str) -> str:
     """Detectar o contexto da mensagem"""
@@ -142,58 +194,130 @@ def detectar_contexto(mensagem: str) -> str:
     
     return "geral"
 
+# Extrator de entidades: um único regex pré-compilado, percorrido uma vez por mensagem
+NUMEROS_POR_EXTENSO = {
+    "um": 1, "uma": 1, "dois": 2, "duas": 2, "três": 3, "tres": 3, "quatro": 4, "cinco": 5,
+    "seis": 6, "sete": 7, "oito": 8, "nove": 9, "dez": 10, "quinze": 15, "vinte": 20, "trinta": 30
+}
+MESES = ("janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho",
+         "agosto", "setembro", "outubro", "novembro", "dezembro")
+ESTACOES = ("verão", "outono", "inverno", "primavera")
+
+_NUMERO = r"(?:\d+|" + "|".join(NUMEROS_POR_EXTENSO) + r")"
+# Depois de "somos"/"vamos em", "um"/"uma" são artigo ("somos um casal", "somos uma família")
+_NUMERO_GRUPO = r"(?:\d+|" + "|".join(n for n in NUMEROS_POR_EXTENSO if n not in ("um", "uma")) + r")"
+# Acima disso um número solto não é quantidade de pessoas ("vamos em 2025")
+MAX_PESSOAS = 50
+_VALOR = r"\d+(?:\.\d{3})*(?:,\d{1,2})?"
+
+PADRAO_ENTIDADES = re.compile(
+    rf"""
+    (?P<duracao>\b(?P<duracao_n>{_NUMERO})\s*(?P<duracao_unidade>dias?|noites?|semanas?)\b)
+    |(?P<fim_de_semana>\bfim\s+de\s+semana\b)
+    |(?P<pessoas>\b(?P<pessoas_n>{_NUMERO})\s*(?:pessoas?|adultos?|viajantes?|amig[oa]s)\b)
+    |(?P<somos>\b(?:somos|seremos|vamos\s+em)\s+(?P<somos_n>{_NUMERO_GRUPO})\b)
+    |(?P<grupo>\b(?:fam[ií]lia|grupo)\s+de\s+(?P<grupo_n>{_NUMERO})\b)
+    |(?P<casal>\bcasal\b)
+    |(?P<sozinho>\bsozinh[oa]\b)
+    |(?P<reais_simbolo>r\$\s*(?P<simbolo_valor>{_VALOR})(?P<simbolo_mil>\s*mil\b)?)
+    |(?P<reais>\b(?P<reais_valor>{_VALOR})(?P<reais_mil>\s*mil)?\s*(?:reais|real)\b)
+    |(?P<epoca>\b(?:{"|".join(MESES + ESTACOES)})\b)
+    |(?P<numero>\b\d+\b)
+    """,
+    re.VERBOSE
+)
+
+def _numero(texto: str) -> int:
+    return int(texto) if texto.isdigit() else NUMEROS_POR_EXTENSO[texto]
+
+def _valor_reais(texto: str, mil: Optional[str]) -> float:
+    valor = float(texto.replace(".", "").replace(",", "."))
+    return valor * 1000 if mil else valor
+
+def extrair_entidades(mensagem_lower: str) -> Dict:
+    """Extrair pessoas, orçamento (R$), época e duração (dias) em uma única passada"""
+    entidades: Dict = {}
+    
+    for encontrado in PADRAO_ENTIDADES.finditer(mensagem_lower):
+        tipo = encontrado.lastgroup
+        if tipo == "duracao":
+            quantidade = _numero(encontrado["duracao_n"])
+            unidade = encontrado["duracao_unidade"]
+            if unidade.startswith("semana"):
+                quantidade *= 7
+            elif unidade.startswith("noite"):
+                quantidade += 1  # N noites de hospedagem = N + 1 dias de viagem
+            entidades.setdefault("duracao", quantidade)
+        elif tipo == "fim_de_semana":
+            entidades.setdefault("duracao", 2)
+        elif tipo == "pessoas":
+            entidades.setdefault("pessoas", _numero(encontrado["pessoas_n"]))
+        elif tipo in ("somos", "grupo"):
+            quantidade = _numero(encontrado[f"{tipo}_n"])
+            if quantidade <= MAX_PESSOAS:
+                entidades.setdefault("pessoas", quantidade)
+        elif tipo == "casal":
+            # "casal" é explícito: prevalece sobre um número citado antes
+            entidades["pessoas"] = 2
+        elif tipo == "sozinho":
+            entidades.setdefault("pessoas", 1)
+        elif tipo == "reais_simbolo":
+            entidades.setdefault("orcamento", _valor_reais(encontrado["simbolo_valor"], encontrado["simbolo_mil"]))
+        elif tipo == "reais":
+            entidades.setdefault("orcamento", _valor_reais(encontrado["reais_valor"], encontrado["reais_mil"]))
+        elif tipo == "epoca":
+            entidades.setdefault("epoca", encontrado["epoca"])
+        elif tipo == "numero":
+            if int(encontrado["numero"]) <= MAX_PESSOAS:
+                entidades.setdefault("numero", int(encontrado["numero"]))
+    
+    return entidades
+
+def detectar_destino(mensagem_lower: str) -> Optional[str]:
+    """Encontrar o primeiro destino do catálogo citado na mensagem"""
+    return next((dest for dest in respostas_destino if dest in mensagem_lower), None)
+
 def gerar_resposta_local(mensagem: str, session_id: str) -> str:
     """Gerar resposta usando lógica local"""
     mensagem_lower = mensagem.lower()
     
-    # Inicializar conversa se não existir
-    if session_id not in conversas:
-        conversas[session_id] = {
-            "mensagens": [],
-            "contexto": {},
-            "destino_atual": None,
-            "pessoas": None,
-            "orcamento": None
-        }
-    
-    conversa = conversas[session_id]
+    # Obter (ou inicializar) a conversa
+    conversa = obter_conversa(session_id)
     
     # Adicionar mensagem do usuário
-    conversa["mensagens"].append({"role": "user", "content": mensagem})
+    conversa.adicionar("user", mensagem)
     
     # Detectar contexto
     contexto = detectar_contexto(mensagem)
     
+    # Preencher as informações da viagem citadas na mensagem
+    entidades = extrair_entidades(mensagem_lower)
+    for campo in ("pessoas", "orcamento", "epoca", "duracao"):
+        if campo in entidades:
+            setattr(conversa, campo, entidades[campo])
+    
     # Primeira mensagem - saudação
-    if len(conversa["mensagens"]) == 1:
+    if conversa.total_mensagens == 1:
         resposta = random.choice(RESPOSTAS_CONTEXTUAIS["saudacao"])
         resposta += "\n\nPara começar, me conte: qual é o seu destino dos sonhos? E quantas pessoas vão viajar com você?"
     
     # Verificar se mencionou algum destino conhecido
-    elif any(dest in mensagem_lower for dest in DESTINOS_BRASIL.keys()):
-        for destino, info in DESTINOS_BRASIL.items():
-            if destino in mensagem_lower:
-                conversa["destino_atual"] = destino
-                resposta = f"🎯 Excelente escolha! {info['descricao']}!\n\n"
-                resposta += f"🏞️ **Principais atrações:**\n• {chr(10) + '• '.join(info['atrações'])}\n\n"
-                resposta += f"🏨 **Opções de hospedagem:**\n• {chr(10) + '• '.join(info['hospedagem'])}\n\n"
-                resposta += f"🍽️ **Gastronomia local:**\n• {chr(10) + '• '.join(info['gastronomia'])}\n\n"
-                resposta += f"💡 **Dicas importantes:**\n• {chr(10) + '• '.join(info['dicas'])}\n\n"
-                resposta += "Agora me conte: quantas pessoas vão viajar? E qual é a duração pretendida da viagem?"
-                break
+    elif (destino := detectar_destino(mensagem_lower)):
+        conversa.destino_atual = destino
+        resposta = respostas_destino[destino][(conversa.pessoas is None, conversa.duracao is None)]
     
     # Respostas baseadas no contexto
     elif contexto in RESPOSTAS_CONTEXTUAIS:
         resposta_base = random.choice(RESPOSTAS_CONTEXTUAIS[contexto])
         
         if contexto == "pessoas":
-            # Extrair número de pessoas
-            import re
-            numeros = re.findall(r'\d+', mensagem)
-            if numeros:
-                conversa["pessoas"] = int(numeros[0])
+            # Número solto na mensagem ("nós 4") também indica o tamanho do grupo
+            pessoas = entidades.get("pessoas", entidades.get("numero"))
+            if pessoas:
+                conversa.pessoas = pessoas
                 resposta = f"{resposta_base}\n"
-                resposta += f"• Qual é o orçamento aproximado por pessoa?\n"
+                if conversa.orcamento is None:
+                    resposta += f"• Qual é o orçamento aproximado por pessoa?\n"
                 resposta += f"• Vocês preferem hospedagem simples ou mais confortável?\n"
                 resposta += f"• Gostam mais de aventura ou relaxamento?\n"
                 resposta += f"• Alguma restrição alimentar ou de mobilidade?"
@@ -211,16 +335,9 @@ def gerar_resposta_local(mensagem: str, session_id: str) -> str:
             resposta += "Quer que eu monte um roteiro detalhado considerando seu orçamento?"
         
         elif contexto == "quando":
-            destino = conversa.get("destino_atual")
-            if destino and destino in DESTINOS_BRASIL:
-                info = DESTINOS_BRASIL[destino]
-                resposta = f"{resposta_base}\n\n"
-                resposta += f"Para **{destino.title()}**:\n"
-                # Adicionar dicas específicas de época se disponível
-                dicas_epoca = [dica for dica in info['dicas'] if any(palavra in dica.lower() for palavra in ['época', 'temporada', 'maio', 'setembro', 'verão', 'inverno'])]
-                if dicas_epoca:
-                    resposta += f"• {chr(10) + '• '.join(dicas_epoca)}\n\n"
-                resposta += "Você já tem uma data específica em mente?"
+            destino = conversa.destino_atual
+            if destino and destino in respostas_epoca:
+                resposta = resposta_base + respostas_epoca[destino]
             else:
                 resposta = resposta_base + "\n\nMe conte qual é o destino para eu dar dicas mais específicas de época!"
         
@@ -242,105 +359,210 @@ def gerar_resposta_local(mensagem: str, session_id: str) -> str:
         resposta = random.choice(respostas_genericas)
         resposta += f"\n\n{random.choice(DICAS_GERAIS)}"
     
-    # Adicionar resposta do assistente
-    conversa["mensagens"].append({"role": "assistant", "content": resposta})
+    # Adicionar resposta do assistente (respostas repetidas compartilham a mesma string)
+    conversa.adicionar("assistant", sys.intern(resposta), compartilhada=True)
     
     return resposta
 
-@app.get("/")
-async def root():
-    return {
-        "message": "🏠 Chat Local funcionando!",
-        "status": "success",
-        "mode": "local",
-        "version": "1.0.0",
-        "features": ["Offline", "Sem APIs externas", "Conhecimento local do Brasil"]
-    }
+# Replay offline de corpus (JSONL com "message" e "session_id" por linha)
+REPLAY_LOTE = 500
+REPLAY_AMOSTRAS = 20
+# Intervalo (segundos) para conferir se um worker morreu enquanto o processo principal espera por ele
+REPLAY_ESPERA = 1.0
 
-@app.get("/health")
-async def health_check():
-    return {
-        "status": "healthy",
-        "service": "chat-local",
-        "mode": "offline",
-        "api_required": False,
-        "openai_configured": False,
-        "local_ready": True
-    }
+def _replay_worker(indice: int, fila, resultados, max_amostras: int):
+    """Processar lotes de mensagens; as sessões de um shard vivem só neste processo
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat_local(request: ChatRequest):
-    """Chat local sem APIs externas"""
-    try:
-        resposta = gerar_resposta_local(request.message, request.session_id)
+    Erro em uma mensagem é contado e não derruba o worker.
+    """
+    intencoes = Counter()
+    destinos = Counter()
+    nao_entendidas: List[str] = []
+    vistas_nao_entendidas = 0
+    total = 0
+    erros = 0
+    
+    while True:
+        lote = fila.get()
+        if lote is None:
+            break
         
-        return ChatResponse(
-            response=resposta,
-            session_id=request.session_id,
-            model_used="local-assistant"
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro no chat local: {str(e)}")
+        for session_id, mensagem in lote:
+            total += 1
+            try:
+                contexto = detectar_contexto(mensagem)
+                destino = detectar_destino(mensagem.lower())
+                gerar_resposta_local(mensagem, session_id)
+            except Exception:
+                erros += 1
+                continue
+            intencoes[contexto] += 1
+            
+            if destino:
+                destinos[destino] += 1
+            elif contexto == "geral":
+                # Amostragem por reservatório: memória constante para qualquer corpus
+                vistas_nao_entendidas += 1
+                if len(nao_entendidas) < max_amostras:
+                    nao_entendidas.append(mensagem)
+                else:
+                    posicao = random.randrange(vistas_nao_entendidas)
+                    if posicao < max_amostras:
+                        nao_entendidas[posicao] = mensagem
+    
+    resultados.put((indice, total, erros, intencoes, destinos, vistas_nao_entendidas, nao_entendidas))
+
+def _enviar(fila, processo, item) -> bool:
+    """Pôr `item` na fila do worker; False se ele morreu (fila cheia não pode travar o replay)"""
+    while True:
+        try:
+            fila.put(item, timeout=REPLAY_ESPERA)
+            return True
+        except queue.Full:
+            if not processo.is_alive():
+                return False
 
-@app.get("/sessions")
-async def list_sessions():
-    """Listar sessões ativas"""
+def replay_corpus(caminho: str, workers: int = 0, max_amostras: int = REPLAY_AMOSTRAS) -> Dict:
+    """Reproduzir um corpus JSONL no motor local usando um pool de processos"""
+    workers = workers or os.cpu_count() or 1
+    filas = [multiprocessing.Queue(maxsize=4) for _ in range(workers)]
+    resultados = multiprocessing.Queue()
+    processos = [
+        multiprocessing.Process(target=_replay_worker, args=(indice, fila, resultados, max_amostras), daemon=True)
+        for indice, fila in enumerate(filas)
+    ]
+    for processo in processos:
+        processo.start()
+    
+    inicio = time.perf_counter()
+    lotes: List[List] = [[] for _ in range(workers)]
+    invalidas = 0
+    # Mensagens que ficaram com um worker que morreu
+    perdidas = 0
+    
+    with open(caminho, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            try:
+                registro = json.loads(linha)
+                mensagem = registro["message"]
+                session_id = str(registro.get("session_id") or "default_session")
+            except (ValueError, KeyError, TypeError, AttributeError):
+                invalidas += 1
+                continue
+            if not isinstance(mensagem, str):
+                invalidas += 1
+                continue
+            
+            # Mesma sessão sempre no mesmo worker (crc32 é estável entre processos)
+            shard = zlib.crc32(session_id.encode()) % workers
+            lote = lotes[shard]
+            lote.append((session_id, mensagem))
+            if len(lote) >= REPLAY_LOTE:
+                if not _enviar(filas[shard], processos[shard], lote):
+                    perdidas += len(lote)
+                lotes[shard] = []
+    
+    for fila, processo, lote in zip(filas, processos, lotes):
+        if lote and not _enviar(fila, processo, lote):
+            perdidas += len(lote)
+        _enviar(fila, processo, None)
+    
+    total = 0
+    erros = 0
+    intencoes = Counter()
+    destinos = Counter()
+    vistas_nao_entendidas = 0
+    nao_entendidas: List[str] = []
+    pendentes = set(range(workers))
+    workers_perdidos = 0
+    while pendentes:
+        # Mortos conferidos antes da espera: o que um worker enviou antes de morrer já está na fila
+        mortos = {indice for indice in pendentes if not processos[indice].is_alive()}
+        try:
+            parcial = resultados.get(timeout=REPLAY_ESPERA)
+        except queue.Empty:
+            pendentes -= mortos
+            workers_perdidos += len(mortos)
+            continue
+        pendentes.discard(parcial[0])
+        total += parcial[1]
+        erros += parcial[2]
+        intencoes.update(parcial[3])
+        destinos.update(parcial[4])
+        vistas_nao_entendidas += parcial[5]
+        nao_entendidas.extend(parcial[6])
+    
+    for processo in processos:
+        processo.join(REPLAY_ESPERA)
+    
+    duracao = time.perf_counter() - inicio
     return {
-        "active_sessions": list(conversas.keys()),
-        "total_sessions": len(conversas)
+        "total_messages": total,
+        "invalid_lines": invalidas,
+        "errors": erros,
+        "lost_messages": perdidas,
+        "failed_workers": workers_perdidos,
+        "workers": workers,
+        "seconds": round(duracao, 3),
+        "messages_per_second": round(total / duracao, 1) if duracao else 0.0,
+        "intents": dict(intencoes.most_common()),
+        "destinations": dict(destinos.most_common()),
+        "unmatched_messages": vistas_nao_entendidas,
+        "unmatched_samples": random.sample(nao_entendidas, min(max_amostras, len(nao_entendidas)))
     }
 
-@app.get("/sessions/{session_id}/history")
-async def get_history(session_id: str):
-    """Obter histórico da sessão"""
-    if session_id in conversas:
-        return {
-            "session_id": session_id,
-            "messages": conversas[session_id]["mensagens"],
-            "total_messages": len(conversas[session_id]["mensagens"]),
-            "context": conversas[session_id]["contexto"]
-        }
-    return {"session_id": session_id, "messages": [], "total_messages": 0}
+def mostrar_replay(relatorio: Dict):
+    """Imprimir o relatório do replay no terminal"""
+    total = relatorio["total_messages"] or 1
+    print("=" * 60)
+    print("📊 REPLAY DO CORPUS - MOTOR LOCAL")
+    print("=" * 60)
+    print(f"📨 Mensagens: {relatorio['total_messages']} ({relatorio['invalid_lines']} linhas inválidas)")
+    if relatorio["errors"] or relatorio["failed_workers"]:
+        print(f"⚠️  Erros: {relatorio['errors']} mensagens, {relatorio['failed_workers']} workers perdidos "
+              f"({relatorio['lost_messages']} mensagens não processadas)")
+    print(f"⚡ Vazão: {relatorio['messages_per_second']:.0f} msg/s com {relatorio['workers']} workers ({relatorio['seconds']}s)")
+    
+    print("\n🧭 Intenções:")
+    for intencao, quantidade in relatorio["intents"].items():
+        print(f"   {intencao:<12} {quantidade:>10}  ({quantidade / total:.1%})")
+    
+    print("\n🗺️  Destinos:")
+    for destino, quantidade in relatorio["destinations"].items():
+        print(f"   {destino.title():<24} {quantidade:>10}  ({quantidade / total:.1%})")
+    
+    print(f"\n❓ Não entendidas: {relatorio['unmatched_messages']} - amostras:")
+    for mensagem in relatorio["unmatched_samples"]:
+        print(f"   • {mensagem}")
 
-@app.delete("/sessions/{session_id}")
-async def clear_session(session_id: str):
-    """Limpar histórico de uma sessão"""
-    if session_id in conversas:
-        del conversas[session_id]
-        return {"message": f"Sessão {session_id} limpa com sucesso"}
+def main_replay(argumentos: List[str]):
+    """Modo CLI: python local_chat.py replay corpus.jsonl"""
+    parser = argparse.ArgumentParser(prog="local_chat.py replay", description="Reproduzir corpus JSONL no motor local")
+    parser.add_argument("corpus", help="arquivo JSONL com 'message' e 'session_id' por linha")
+    parser.add_argument("--workers", type=int, default=0, help="processos (padrão: número de CPUs)")
+    parser.add_argument("--samples", type=int, default=REPLAY_AMOSTRAS, help="amostras de mensagens não entendidas")
+    parser.add_argument("--json", action="store_true", help="imprimir o relatório em JSON")
+    args = parser.parse_args(argumentos)
+    
+    relatorio = replay_corpus(args.corpus, args.workers, args.samples)
+    if args.json:
+        print(json.dumps(relatorio, ensure_ascii=False, indent=2))
     else:
-        raise HTTPException(status_code=404, detail="Sessão não encontrada")
+        mostrar_replay(relatorio)
 
-@app.delete("/sessions")
-async def clear_all_sessions():
-    """Limpar todas as sessões"""
-    conversas.clear()
-    return {"message": "Todas as sessões foram limpas"}
-
-@app.get("/destinations")
-async def list_destinations():
-    """Listar destinos disponíveis no conhecimento local"""
-    destinos = []
-    for nome, info in DESTINOS_BRASIL.items():
-        destinos.append({
-            "nome": nome.title(),
-            "descricao": info["descricao"],
-            "total_atracoes": len(info["atrações"])
-        })
-    
-    return {
-        "total_destinations": len(destinos),
-        "destinations": destinos
-    }
+if __name__ == "__main__" and sys.argv[1:2] == ["replay"]:
+    main_replay(sys.argv[2:])
 
-if __name__ == "__main__":
+elif __name__ == "__main__":
     print("🏠 Iniciando Chat Local - Assistente de Viagem")
     print("🌐 Será executado em: http://localhost:8001")
     print("📚 Base de conhecimento: Brasil")
-    print("🔧 Modo: Offline (sem APIs externas)")
+    print("🔧 Modo: Offline (motor local como padrão do servidor unificado)")
     
+    # Mesmo app de main.py; sem "engine" na requisição, responde o motor local
+    os.environ["DEFAULT_ENGINE"] = "local"
     uvicorn.run(
-        "local_chat:app", 
+        "main:app", 
         host="127.0.0.1", 
         port=8001, 
         reload=True,
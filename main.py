@@ -1,9 +1,17 @@
 import os
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket
+from functools import lru_cache
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, Literal, Optional
 import uvicorn
+from admission import AdmissionQueue, ClientDisconnected, Overloaded, cancel_on_disconnect
+from cached_response import CachedJSON
+from llm_http import OPENAI_API_BASE, create_llm_http_client, llm_timeout, warm_up
+from serialization import render
+from settings import settings
+from turns import SessionTurns
+from ws_chat import serve_chat_socket
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -17,12 +25,21 @@ if openai_key:
 else:
     print("⚠️ WARNING: OPENAI_API_KEY not found in environment")
 
+# Diagnóstico de memória: tracemalloc ligado antes de importar o LangChain
+if settings.debug_memory:
+    import memory_debug
+    memory_debug.iniciar()
+    print("🧠 DEBUG_MEMORY ativo: tracemalloc ligado, /debug/memory disponível")
+
 # Importações do LangChain
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
+
+# Motores de chat e sessões compartilhadas
+import local_chat
+from engines import (DEFAULT_ENGINE, ENGINE_NAMES, OpenAIEngine, engines, fixar_engine, register_engine,
+                     select_engine)
+from sessions import MAX_HISTORY_MESSAGES, MAX_SESSIONS, conversas, memoria_sessoes
 
 # Criar instância do FastAPI
 app = FastAPI(
@@ -31,15 +48,39 @@ app = FastAPI(
     version="1.0.0"
 )
 
+EngineName = Literal["openai", "local", "auto"]
+
+# Maior max_tokens aceito por requisição
+MAX_TOKENS_LIMIT = 4096
+# Instâncias do LLM mantidas em cache (uma por modelo, temperatura e max_tokens)
+LLM_CACHE_SIZE = 16
+
 # Modelos Pydantic para as requisições
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = "default_session"
+    # Motor desta mensagem; passa a valer para a sessão. None mantém o da sessão (ou DEFAULT_ENGINE)
+    engine: Optional[EngineName] = None
+    # Ajustes do LLM só para esta mensagem (None usa MODEL_NAME, TEMPERATURE, MAX_TOKENS)
+    model: Optional[str] = None
+    temperature: Optional[float] = Field(None, ge=0, le=2)
+    max_tokens: Optional[int] = Field(None, ge=1, le=MAX_TOKENS_LIMIT)
+    
+    @field_validator("model")
+    @classmethod
+    def modelo_permitido(cls, model: Optional[str]) -> Optional[str]:
+        if model is not None and model not in settings.allowed_models:
+            raise ValueError(f"modelo não permitido; use um de: {', '.join(settings.allowed_models)}")
+        return model
+    
+    def llm_overrides(self) -> Dict:
+        return self.model_dump(include={"model", "temperature", "max_tokens"}, exclude_none=True)
 
 class ChatResponse(BaseModel):
     response: str
     session_id: str
     model_used: str
+    engine: str
 
 # Configuração do LangChain
 template = """
@@ -59,119 +100,179 @@ prompt = ChatPromptTemplate.from_messages([
     ("human", "{input}")
 ])
 
-# Inicializar o modelo
-try:
+# Cliente HTTP compartilhado pelas chamadas ao LLM (pool, keep-alive, timeouts)
+llm_http_client = create_llm_http_client()
+
+@lru_cache(maxsize=LLM_CACHE_SIZE)
+def get_chain(model: str, temperature: float, max_tokens: int):
+    """Chain com uma instância do LLM por (modelo, temperatura, max_tokens), criada uma vez"""
     llm = ChatOpenAI(
-        temperature=0.7, 
-        model="gpt-3.5-turbo",  # Modelo mais barato
-        openai_api_key=os.getenv("OPENAI_API_KEY")
+        temperature=temperature,
+        model=model,
+        max_tokens=max_tokens,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        openai_api_base=OPENAI_API_BASE,
+        http_async_client=llm_http_client,
+        request_timeout=llm_timeout()
     )
-    print("✅ LLM initialized successfully")
+    return prompt | llm
+
+# Inicializar o modelo padrão (sem chave o motor "openai" fica indisponível e "auto" usa o local)
+try:
+    get_chain(settings.model_name, settings.temperature, settings.max_tokens)
+    print(f"✅ LLM initialized successfully ({settings.model_name}, temperature={settings.temperature}, "
+          f"max_tokens={settings.max_tokens})")
 except Exception as e:
     print(f"❌ Error initializing LLM: {e}")
-    llm = None
-
-# Criar a chain
-chain = prompt | llm
-
-# Store para histórico de conversas
-store = {}
-
-def get_session_history(session_id: str) -> BaseChatMessageHistory:
-    """Obtém o histórico de mensagens para uma sessão específica."""
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
-
-# Chain com histórico
-chain_with_history = RunnableWithMessageHistory(
-    chain,
-    get_session_history,
-    input_messages_key="input",
-    history_messages_key="history"
-)
+
+# Fila de admissão na frente do LLM: limita chamadas simultâneas e descarta as que perderiam o prazo
+llm_admission = AdmissionQueue()
+
+register_engine(OpenAIEngine(get_chain, settings, admission=llm_admission))
+
+# Um turno por vez em cada sessão (qualquer motor); sessões diferentes em paralelo
+session_turns = SessionTurns()
+
+# Respostas pré-serializadas dos endpoints de status (com ETag)
+root_response = CachedJSON({
+    "message": "🚀 Chat Inteligente API está funcionando!",
+    "status": "success",
+    "version": "1.0.0",
+    "features": ["FastAPI", "LangChain", "OpenAI", "Chat Local", "Chat History"]
+}, cache_control="public, max-age=60")
+
+info_response = CachedJSON({
+    "name": "Chat Inteligente",
+    "description": "API para chat com IA usando LangChain ou base de conhecimento local",
+    "model": settings.model_name,
+    "llm_defaults": {
+        "temperature": settings.temperature,
+        "max_tokens": settings.max_tokens,
+        "request_timeout": settings.request_timeout
+    },
+    "allowed_models": settings.allowed_models,
+    "engines": list(ENGINE_NAMES),
+    "default_engine": DEFAULT_ENGINE,
+    "features": [
+        "Assistente de Viagem",
+        "Histórico de Conversas",
+        "Múltiplas Sessões",
+        "Motor por requisição ou por sessão"
+    ],
+    "endpoints": {
+        "root": "/",
+        "health": "/health",
+        "chat": "/chat",
+        "ws_chat": "/ws/chat",
+        "sessions": "/sessions",
+        "destinations": "/destinations",
+        "admission": "/admission",
+        "docs": "/docs",
+        "redoc": "/redoc"
+    }
+}, cache_control="public, max-age=60")
+
+# Resultado do aquecimento das conexões com o LLM (None se não aquecido)
+llm_warmup: Optional[dict] = None
+
+def _health_content(openai_configured: bool) -> dict:
+    return {
+        "status": "healthy",
+        "service": "chat-inteligente",
+        "openai_configured": openai_configured,
+        "langchain_ready": True,
+        "local_ready": True,
+        "default_engine": DEFAULT_ENGINE,
+        "engines": {name: engine.available() for name, engine in engines.items()},
+        "llm_warmup": llm_warmup
+    }
+
+health_openai_configured = bool(os.getenv("OPENAI_API_KEY"))
+health_response = CachedJSON(_health_content(health_openai_configured))
+
+@app.on_event("startup")
+async def warm_up_llm():
+    """Abrir as conexões com o LLM antes de aceitar requisições"""
+    global llm_warmup
+    if not engines["openai"].available():
+        return
+    
+    llm_warmup = await warm_up(llm_http_client, api_key=os.getenv("OPENAI_API_KEY"))
+    health_response.atualizar(_health_content(health_openai_configured))
+    print(f"🔥 LLM warm-up: {llm_warmup['responses']}/{llm_warmup['requested']} conexões "
+          f"em {llm_warmup['seconds']}s ({llm_warmup['base_url']})")
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await llm_http_client.aclose()
 
 # Endpoints da API
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Endpoint raiz"""
-    return {
-        "message": "🚀 Chat Inteligente API está funcionando!",
-        "status": "success",
-        "version": "1.0.0",
-        "features": ["FastAPI", "LangChain", "OpenAI", "Chat History"]
-    }
+    return root_response.responder(request)
 
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Verificar saúde da API"""
-    # Verificar se a chave da OpenAI está configurada
+    global health_openai_configured
+    # Verificar se a chave da OpenAI está configurada (regenera só se mudou)
     openai_configured = bool(os.getenv("OPENAI_API_KEY"))
+    if openai_configured != health_openai_configured:
+        health_openai_configured = openai_configured
+        health_response.atualizar(_health_content(openai_configured))
     
-    return {
-        "status": "healthy",
-        "service": "chat-inteligente",
-        "openai_configured": openai_configured,
-        "langchain_ready": True
-    }
+    return health_response.responder(request)
 
 @app.get("/info")
-async def info():
+async def info(request: Request):
     """Informações sobre a API"""
-    return {
-        "name": "Chat Inteligente",
-        "description": "API para chat com IA usando LangChain",
-        "model": "gpt-4o-mini",
-        "features": [
-            "Assistente de Viagem",
-            "Histórico de Conversas",
-            "Múltiplas Sessões"
-        ],
-        "endpoints": {
-            "root": "/",
-            "health": "/health",
-            "chat": "/chat",
-            "sessions": "/sessions",
-            "docs": "/docs",
-            "redoc": "/redoc"
-        }
-    }
+    return info_response.responder(request)
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
-    """Endpoint principal de chat"""
+async def chat_endpoint(request: ChatRequest, http_request: Request):
+    """Endpoint principal de chat (motor escolhido por requisição ou por sessão)"""
+    # Prazo contado da chegada: inclui a espera pelo turno anterior da mesma sessão
+    prazo = llm_admission.deadline_from_now()
+    engine = select_engine(request.session_id, request.engine)
+    print(f"🔍 DEBUG: Engine: {engine.name} | Session ID: {request.session_id}")
+    
+    # Motor OpenAI pedido explicitamente sem chave configurada
+    if not engine.available():
+        print("❌ ERROR: OPENAI_API_KEY não encontrada")
+        raise HTTPException(
+            status_code=500, 
+            detail="OPENAI_API_KEY não configurada. Adicione no arquivo .env"
+        )
+    fixar_engine(request.session_id, request.engine)
+    
     try:
-        # Debug: Verificar variáveis de ambiente
-        openai_key = os.getenv("OPENAI_API_KEY")
-        print(f"🔍 DEBUG: OpenAI key configured: {bool(openai_key)}")
-        if openai_key:
-            print(f"🔍 DEBUG: OpenAI key starts with: {openai_key[:10]}...")
-        
-        # Verificar se a chave da OpenAI está configurada
-        if not openai_key:
-            print("❌ ERROR: OPENAI_API_KEY não encontrada")
-            raise HTTPException(
-                status_code=500, 
-                detail="OPENAI_API_KEY não configurada. Adicione no arquivo .env"
-            )
-        
         print(f"🔍 DEBUG: Processing message: {request.message[:50]}...")
-        print(f"🔍 DEBUG: Session ID: {request.session_id}")
         
-        # Processar a mensagem
-        resposta = chain_with_history.invoke(
-            {'input': request.message},
-            config={'configurable': {'session_id': request.session_id}}
-        )
+        # Processar a mensagem (cancelada se o cliente desistir)
+        overrides = request.llm_overrides()
+        resposta = await cancel_on_disconnect(http_request, session_turns.run(
+            request.session_id, request.message,
+            lambda: engine.respond(request.message, request.session_id, overrides, prazo),
+            extra_key=(engine.name, tuple(sorted(overrides.items())))
+        ))
         
         print(f"✅ DEBUG: Response generated successfully")
         
-        return ChatResponse(
-            response=resposta.content,
+        return render(http_request, ChatResponse(
+            response=resposta,
             session_id=request.session_id,
-            model_used="gpt-3.5-turbo"
-        )
+            model_used=engine.model_for(overrides),
+            engine=engine.name
+        ).model_dump())
         
+    except Overloaded as e:
+        print(f"⚠️ WARNING: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ClientDisconnected:
+        print("⚠️ WARNING: Cliente desconectou; chamada cancelada")
+        # 499: cliente fechou a conexão (ninguém vai ler esta resposta)
+        return Response(status_code=499)
     except Exception as e:
         print(f"❌ ERROR in chat endpoint: {str(e)}")
         print(f"❌ ERROR type: {type(e).__name__}")
@@ -179,40 +280,74 @@ async def chat_endpoint(request: ChatRequest):
         print(f"❌ TRACEBACK: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Erro no processamento: {str(e)}")
 
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    """Chat por WebSocket: sessão fixada na conexão (?session_id=...&engine=...), respostas em streaming"""
+    requested = websocket.query_params.get("engine") or None
+    if requested is not None and requested not in ENGINE_NAMES:
+        await websocket.close(code=1008, reason=f"engine deve ser um de: {', '.join(ENGINE_NAMES)}")
+        return
+    
+    def responder(message: str, session_id: str):
+        prazo = llm_admission.deadline_from_now()
+        engine = select_engine(session_id, requested)
+        if not engine.available():
+            raise RuntimeError("OPENAI_API_KEY não configurada. Adicione no arquivo .env")
+        fixar_engine(session_id, requested)
+        return engine.model_used, session_turns.stream(session_id, engine.stream(message, session_id, deadline=prazo))
+    
+    await serve_chat_socket(websocket, responder)
+
+@app.get("/admission")
+async def admission_stats(request: Request):
+    """Estatísticas da fila de admissão do LLM (profundidade, espera, recusas)"""
+    return render(request, llm_admission.stats())
+
+if settings.debug_memory:
+    @app.get("/debug/memory")
+    async def debug_memory(request: Request, top: int = Query(15, ge=1, le=100), diff: bool = True, reset: bool = True):
+        """Alocações (tracemalloc), tamanho das sessões e contagem de objetos
+
+        Percorre o heap no loop de eventos: use só para diagnóstico.
+        """
+        return render(request, memory_debug.relatorio(top, diff, reset))
+
 @app.get("/sessions")
-async def list_sessions():
+async def list_sessions(request: Request):
     """Listar sessões ativas"""
-    return {
-        "active_sessions": list(store.keys()),
-        "total_sessions": len(store)
-    }
+    return render(request, {
+        "active_sessions": list(conversas.keys()),
+        "total_sessions": len(conversas),
+        "limits": {
+            "max_sessions": MAX_SESSIONS,
+            "max_history_messages": MAX_HISTORY_MESSAGES
+        },
+        "memory": memoria_sessoes(),
+        "turns": session_turns.stats()
+    })
 
 @app.get("/sessions/{session_id}/history")
-async def get_session_history_endpoint(session_id: str):
-    """Obter histórico de uma sessão específica"""
-    if session_id not in store:
+async def get_session_history_endpoint(request: Request, session_id: str, since: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
+    """Obter histórico de uma sessão específica (apenas mensagens com índice >= since)"""
+    if session_id not in conversas:
         raise HTTPException(status_code=404, detail="Sessão não encontrada")
     
-    history = store[session_id]
-    messages = []
-    
-    for message in history.messages:
-        messages.append({
-            "type": message.__class__.__name__,
-            "content": message.content
-        })
-    
-    return {
+    conversa = conversas[session_id]
+    return render(request, {
         "session_id": session_id,
-        "messages": messages,
-        "total_messages": len(messages)
-    }
+        "engine": conversa.engine or DEFAULT_ENGINE,
+        "messages": conversa.mensagens_desde(since, limit),
+        "total_messages": conversa.total_mensagens,
+        "next_index": conversa.total_mensagens,
+        "context": conversa.contexto,
+        "compression": conversa.compressao()
+    })
 
 @app.delete("/sessions/{session_id}")
 async def clear_session(session_id: str):
     """Limpar histórico de uma sessão"""
-    if session_id in store:
-        del store[session_id]
+    if session_id in conversas:
+        del conversas[session_id]
         return {"message": f"Sessão {session_id} limpa com sucesso"}
     else:
         raise HTTPException(status_code=404, detail="Sessão não encontrada")
@@ -220,9 +355,14 @@ async def clear_session(session_id: str):
 @app.delete("/sessions")
 async def clear_all_sessions():
     """Limpar todas as sessões"""
-    store.clear()
+    conversas.clear()
     return {"message": "Todas as sessões foram limpas"}
 
+@app.get("/destinations")
+async def list_destinations(request: Request):
+    """Listar destinos disponíveis na base local"""
+    return local_chat.destinations_response.responder(request)
+
 # Função para executar o servidor
 def run_server():
     """Executar o servidor FastAPI"""
@@ -235,4 +375,4 @@ def run_server():
     )
 
 if __name__ == "__main__":
-    run_server()
\ No newline at end of file
+    run_server()
@@ -0,0 +1,151 @@
+"""
+Diagnóstico de memória (opt-in: DEBUG_MEMORY=true)
+- tracemalloc: principais locais de alocação e diferença desde o snapshot anterior
+- Sessões: quantidade, tamanho profundo estimado e as maiores
+- Contagem de objetos que costumam acumular (sessões, mensagens do LangChain, instâncias do LLM)
+"""
+
+import gc
+import sys
+import tracemalloc
+from collections import deque
+from typing import Dict, Optional
+
+from sessions import conversas
+
+# Quadros de pilha guardados por alocação (mais quadros = mais memória do próprio tracemalloc)
+MEMORY_TRACE_FRAMES = 5
+# Alocações do próprio diagnóstico não interessam
+IGNORAR = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+# Classes contadas em /debug/memory (nome do módulo, nome da classe)
+TIPOS_CONTADOS = (
+    ("sessions", "Conversa"),
+    ("sessions", "Mensagem"),
+    ("sessions", "MensagemCompartilhada"),
+    ("langchain_core.messages.human", "HumanMessage"),
+    ("langchain_core.messages.ai", "AIMessage"),
+    ("langchain_core.messages.ai", "AIMessageChunk"),
+    ("langchain_openai.chat_models.base", "ChatOpenAI"),
+)
+
+# Snapshot de referência para a próxima diferença
+_snapshot_anterior: Optional[tracemalloc.Snapshot] = None
+
+def iniciar(frames: int = MEMORY_TRACE_FRAMES):
+    """Ligar o tracemalloc (o quanto antes, para ver as alocações da inicialização)"""
+    global _snapshot_anterior
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _snapshot_anterior = _snapshot()
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(IGNORAR)
+
+def _formatar(stat) -> Dict:
+    quadro = stat.traceback[0]
+    return {"site": f"{quadro.filename}:{quadro.lineno}", "size_bytes": stat.size, "count": stat.count}
+
+def _formatar_diff(stat) -> Dict:
+    quadro = stat.traceback[0]
+    return {"site": f"{quadro.filename}:{quadro.lineno}", "size_diff_bytes": stat.size_diff,
+            "count_diff": stat.count_diff, "size_bytes": stat.size}
+
+def tamanho_profundo(obj, vistos: Optional[set] = None) -> int:
+    """Estimar bytes de `obj` e de tudo que ele referencia (objetos em `vistos` não são recontados)
+
+    Segue dicts, sequências, conjuntos, __dict__ e __slots__; classes, módulos e funções são ignorados.
+    """
+    if vistos is None:
+        vistos = set()
+    total = 0
+    pendentes = deque([obj])
+    while pendentes:
+        atual = pendentes.pop()
+        if id(atual) in vistos or isinstance(atual, (type, type(sys), type(tamanho_profundo))):
+            continue
+        vistos.add(id(atual))
+        total += sys.getsizeof(atual)
+
+        if isinstance(atual, dict):
+            pendentes.extend(atual.keys())
+            pendentes.extend(atual.values())
+        elif isinstance(atual, (list, tuple, set, frozenset, deque)):
+            pendentes.extend(atual)
+        if hasattr(atual, "__dict__"):
+            pendentes.append(atual.__dict__)
+        # Slots das classes base também (ex.: MensagemCompartilhada herda os de Mensagem)
+        for classe in type(atual).__mro__:
+            slots = classe.__dict__.get("__slots__", ())
+            for slot in (slots,) if isinstance(slots, str) else slots:
+                if hasattr(atual, slot):
+                    pendentes.append(getattr(atual, slot))
+    return total
+
+def resumo_sessoes(maiores: int = 10) -> Dict:
+    """Quantidade de sessões, tamanho profundo total e as `maiores` sessões"""
+    tamanhos = {session_id: tamanho_profundo(conversa) for session_id, conversa in conversas.items()}
+    # No total, strings compartilhadas entre sessões (respostas internadas) contam uma vez
+    vistos = set()
+    total = sum(tamanho_profundo(conversa, vistos) for conversa in conversas.values())
+    ordenadas = sorted(tamanhos.items(), key=lambda item: item[1], reverse=True)[:maiores]
+    return {
+        "count": len(conversas),
+        "deep_size_bytes": total,
+        "deep_size_bytes_unshared": sum(tamanhos.values()),
+        "largest": [
+            {
+                "session_id": session_id,
+                "deep_size_bytes": tamanho,
+                "messages": conversas[session_id].retidas,
+                "compression": conversas[session_id].compressao(),
+                "total_messages": conversas[session_id].total_mensagens,
+                "engine": conversas[session_id].engine
+            }
+            for session_id, tamanho in ordenadas
+        ]
+    }
+
+def contar_objetos() -> Dict[str, int]:
+    """Instâncias vivas das classes em TIPOS_CONTADOS (percorre o heap: custo proporcional a ele)"""
+    tipos = {}
+    for modulo, nome in TIPOS_CONTADOS:
+        classe = getattr(sys.modules.get(modulo), nome, None)
+        if classe is not None:
+            tipos[classe] = nome
+    contagem = dict.fromkeys(tipos.values(), 0)
+    for obj in gc.get_objects():
+        nome = tipos.get(type(obj))
+        if nome is not None:
+            contagem[nome] += 1
+    return contagem
+
+def relatorio(top: int = 15, diff: bool = True, reset: bool = True) -> Dict:
+    """Relatório completo; `reset` faz deste snapshot a referência da próxima diferença"""
+    global _snapshot_anterior
+    gc.collect()
+    dados: Dict = {"tracemalloc": {"tracing": tracemalloc.is_tracing()}}
+
+    if tracemalloc.is_tracing():
+        atual, pico = tracemalloc.get_traced_memory()
+        snapshot = _snapshot()
+        dados["tracemalloc"].update({
+            "current_bytes": atual,
+            "peak_bytes": pico,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "top_sites": [_formatar(stat) for stat in snapshot.statistics("lineno")[:top]],
+        })
+        if diff and _snapshot_anterior is not None:
+            dados["tracemalloc"]["diff_since_previous"] = [
+                _formatar_diff(stat) for stat in snapshot.compare_to(_snapshot_anterior, "lineno")[:top]
+            ]
+        if reset:
+            _snapshot_anterior = snapshot
+
+    dados["sessions"] = resumo_sessoes(top)
+    dados["objects"] = contar_objetos()
+    return dados
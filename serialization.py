@@ -0,0 +1,89 @@
+"""
+Serialização negociada das respostas da API
+- Accept: application/msgpack  -> MessagePack (se msgpack estiver instalado)
+- Accept: application/json     -> JSON (orjson quando disponível)
+- Accept-Encoding: zstd / gzip -> compressão para corpos acima de COMPRESSION_MIN_SIZE
+"""
+
+import gzip
+import json
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+# Codificadores opcionais: sem eles, JSON padrão e gzip continuam funcionando
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+JSON_MEDIA_TYPE = "application/json"
+
+# Corpos menores que isso não compensam comprimir
+COMPRESSION_MIN_SIZE = 1024
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+def encode_json(content: Any) -> bytes:
+    """JSON compacto em UTF-8 (mesmo formato do JSONResponse do FastAPI)"""
+    try:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+    except (TypeError, UnicodeEncodeError):
+        # Surrogate solto vindo do JSON da requisição: escapado ("\ud83d") continua JSON válido
+        return json.dumps(content, ensure_ascii=True, allow_nan=False, indent=None, separators=(",", ":")).encode("ascii")
+
+def encode_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, use_bin_type=True)
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    compressors = {}
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        compressors["zstd"] = compressor.compress
+    compressors["gzip"] = lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return compressors
+
+# Ordem de preferência: zstd (mais rápido) antes de gzip
+COMPRESSORS = _compressors()
+
+def choose_encoding(accept: str) -> Tuple[str, Callable[[Any], bytes]]:
+    """Escolher o formato do corpo a partir do cabeçalho Accept"""
+    if msgpack is not None and ("application/msgpack" in accept or "application/x-msgpack" in accept):
+        return MSGPACK_MEDIA_TYPE, encode_msgpack
+    return JSON_MEDIA_TYPE, encode_json
+
+def choose_compression(accept_encoding: str) -> Optional[str]:
+    """Escolher a compressão aceita pelo cliente (None se nenhuma)"""
+    aceitas = {
+        item.split(";")[0].strip().lower()
+        for item in accept_encoding.split(",")
+        if not item.replace(" ", "").endswith(";q=0")
+    }
+    return next((nome for nome in COMPRESSORS if nome in aceitas), None)
+
+def render(request: Request, content: Any, status_code: int = 200) -> Response:
+    """Serializar `content` no formato e compressão pedidos pelo cliente"""
+    media_type, encode = choose_encoding(request.headers.get("accept", ""))
+    body = encode(content)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+
+    if len(body) >= COMPRESSION_MIN_SIZE:
+        compression = choose_compression(request.headers.get("accept-encoding", ""))
+        if compression:
+            body = COMPRESSORS[compression](body)
+            headers["Content-Encoding"] = compression
+
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
@@ -0,0 +1,228 @@
+"""
+Armazenamento de sessões compartilhado pelos motores de chat (OpenAI e local)
+Histórico compacto, limitado aos turnos recentes, com despejo das sessões menos usadas
+
+Histórico em dois níveis:
+- recentes (HOT_HISTORY_MESSAGES): objetos Mensagem, lidos a cada turno
+- antigos: blocos de HISTORY_BLOCK_MESSAGES mensagens comprimidos (zstd, ou zlib sem o pacote),
+  descomprimidos só quando o histórico completo é pedido
+"""
+
+import json
+import sys
+import zlib
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from settings import settings
+
+# Compressão opcional: sem zstandard, zlib
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Limites de armazenamento das conversas
+MAX_SESSIONS = settings.max_sessions
+MAX_HISTORY_MESSAGES = settings.max_history_messages
+HOT_HISTORY_MESSAGES = settings.hot_history_messages
+HISTORY_BLOCK_MESSAGES = settings.history_block_messages
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+class Mensagem:
+    """Turno da conversa em formato compacto"""
+    __slots__ = ("role", "content")
+    
+    def __init__(self, role: str, content: str):
+        self.role = role
+        self.content = content
+    
+    def to_dict(self, index: int) -> Dict:
+        # "type" mantém o formato que main.py usava (classes de mensagem do LangChain)
+        message_type = "HumanMessage" if self.role == "user" else "AIMessage"
+        return {"index": index, "role": self.role, "type": message_type, "content": self.content}
+
+class MensagemCompartilhada(Mensagem):
+    """Mensagem cujo texto é compartilhado entre sessões (ex.: respostas internadas do motor local)
+
+    Comprimir não economiza nada (o texto continua vivo em outro lugar): nos blocos antigos
+    ela é guardada por referência.
+    """
+    __slots__ = ()
+
+def _comprimir(dados: bytes) -> Tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(dados)
+    return "zlib", zlib.compress(dados, ZLIB_LEVEL)
+
+def _descomprimir(codec: str, dados: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(dados)
+    return zlib.decompress(dados)
+
+class BlocoComprimido:
+    """Mensagens antigas em um único bytes comprimido (compartilhadas ficam por referência)"""
+    __slots__ = ("codec", "dados", "compartilhadas", "quantidade", "tamanho_original")
+    
+    def __init__(self, mensagens: List[Mensagem]):
+        # Lugar das compartilhadas marcado com None no JSON
+        itens = [None if isinstance(m, MensagemCompartilhada) else [m.role, m.content] for m in mensagens]
+        # surrogatepass: o JSON da requisição aceita surrogates soltos ("\ud83d"), o UTF-8 estrito não
+        self.codec, self.dados = _comprimir(
+            json.dumps(itens, ensure_ascii=False, separators=(",", ":")).encode("utf-8", "surrogatepass")
+        )
+        self.compartilhadas = tuple(m for m in mensagens if isinstance(m, MensagemCompartilhada))
+        self.quantidade = len(mensagens)
+        # Bytes que as mensagens não compartilhadas ocupavam como objetos
+        self.tamanho_original = sum(
+            sys.getsizeof(m) + sys.getsizeof(m.content) for m in mensagens if not isinstance(m, MensagemCompartilhada)
+        )
+    
+    def mensagens(self) -> List[Mensagem]:
+        compartilhadas = iter(self.compartilhadas)
+        itens = json.loads(_descomprimir(self.codec, self.dados).decode("utf-8", "surrogatepass"))
+        return [next(compartilhadas) if item is None else Mensagem(*item) for item in itens]
+    
+    def tamanho(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self.dados) + sys.getsizeof(self.compartilhadas)
+
+class Conversa:
+    """Estado de uma sessão com histórico limitado aos turnos recentes"""
+    __slots__ = ("mensagens", "blocos", "mensagens_antigas", "total_mensagens", "contexto", "engine",
+                 "destino_atual", "pessoas", "orcamento", "epoca", "duracao")
+    
+    def __init__(self):
+        # Nível recente (objetos) e nível antigo (blocos comprimidos, do mais antigo ao mais novo)
+        self.mensagens: deque = deque()
+        # Lista (não deque): sessões curtas nunca têm blocos e deque vazio ocupa ~600 bytes
+        self.blocos: List[BlocoComprimido] = []
+        self.mensagens_antigas = 0
+        self.total_mensagens = 0
+        self.contexto: Dict = {}
+        # Motor escolhido para a sessão ("openai", "local", "auto"); None usa o padrão
+        self.engine: Optional[str] = None
+        self.destino_atual: Optional[str] = None
+        self.pessoas: Optional[int] = None
+        self.orcamento: Optional[float] = None
+        self.epoca: Optional[str] = None
+        self.duracao: Optional[int] = None
+    
+    @property
+    def retidas(self) -> int:
+        """Mensagens guardadas (recentes + antigas)"""
+        return len(self.mensagens) + self.mensagens_antigas
+    
+    def adicionar(self, role: str, content: str, compartilhada: bool = False):
+        self.mensagens.append((MensagemCompartilhada if compartilhada else Mensagem)(role, content))
+        self.total_mensagens += 1
+        
+        # Recentes passaram do limite: as mais antigas viram um bloco comprimido
+        if len(self.mensagens) >= HOT_HISTORY_MESSAGES + HISTORY_BLOCK_MESSAGES:
+            # Bloco montado antes de remover: se falhar, as mensagens continuam nas recentes
+            bloco = BlocoComprimido(list(islice(self.mensagens, HISTORY_BLOCK_MESSAGES)))
+            for _ in range(HISTORY_BLOCK_MESSAGES):
+                self.mensagens.popleft()
+            self.blocos.append(bloco)
+            self.mensagens_antigas += bloco.quantidade
+        
+        # Limite total: descartar primeiro os blocos antigos
+        while self.retidas > MAX_HISTORY_MESSAGES:
+            if self.blocos:
+                self.mensagens_antigas -= self.blocos.pop(0).quantidade
+            else:
+                self.mensagens.popleft()
+    
+    def recentes(self) -> List[Mensagem]:
+        """Só o nível recente (sem descomprimir nada): o que entra no prompt do LLM"""
+        return list(self.mensagens)
+    
+    def mensagens_desde(self, since: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Mensagens com índice >= since (índices crescem sempre, mesmo após descartes)
+
+        Blocos antigos só são descomprimidos se o intervalo pedido os alcançar.
+        """
+        primeiro = self.total_mensagens - self.retidas
+        inicio = max(since, primeiro)
+        fim = self.total_mensagens if limit is None else min(self.total_mensagens, inicio + limit)
+        return [mensagem.to_dict(index) for index, mensagem in self._intervalo(primeiro, inicio, fim)]
+    
+    def _intervalo(self, primeiro: int, inicio: int, fim: int) -> Iterator[Tuple[int, Mensagem]]:
+        index = primeiro
+        for bloco in self.blocos:
+            if index >= fim:
+                return
+            if index + bloco.quantidade > inicio:
+                for mensagem in bloco.mensagens():
+                    if inicio <= index < fim:
+                        yield index, mensagem
+                    index += 1
+            else:
+                index += bloco.quantidade
+        
+        recentes_inicio = max(0, inicio - index)
+        yield from enumerate(islice(self.mensagens, recentes_inicio, max(recentes_inicio, fim - index)),
+                             index + recentes_inicio)
+    
+    def compressao(self) -> Dict:
+        """Taxa de compressão e memória economizada pelo nível antigo"""
+        original = sum(bloco.tamanho_original for bloco in self.blocos)
+        comprimido = sum(sys.getsizeof(bloco.dados) for bloco in self.blocos)
+        ocupado = sum(bloco.tamanho() for bloco in self.blocos)
+        return {
+            "hot_messages": len(self.mensagens),
+            "cold_messages": self.mensagens_antigas,
+            "blocks": len(self.blocos),
+            "original_bytes": original,
+            "compressed_bytes": comprimido,
+            "ratio": round(original / comprimido, 2) if comprimido else None,
+            "saved_bytes": original - ocupado
+        }
+    
+    def memoria(self, vistos: Optional[set] = None) -> int:
+        """Estimar bytes ocupados pela sessão (objetos em `vistos` não são recontados)"""
+        if vistos is None:
+            vistos = set()
+        total = 0
+        for obj in (self, self.mensagens, self.blocos, self.contexto, *self.mensagens,
+                    *(mensagem.content for mensagem in self.mensagens),
+                    *self.blocos, *(bloco.dados for bloco in self.blocos),
+                    *(bloco.compartilhadas for bloco in self.blocos),
+                    *(m.content for bloco in self.blocos for m in bloco.compartilhadas)):
+            if id(obj) not in vistos:
+                vistos.add(id(obj))
+                total += sys.getsizeof(obj)
+        return total
+
+# Armazenar conversas (ordem de uso recente, para despejar as mais antigas)
+conversas: "OrderedDict[str, Conversa]" = OrderedDict()
+
+def obter_conversa(session_id: str) -> Conversa:
+    """Obter a sessão, criando-a e despejando as menos usadas se preciso"""
+    conversa = conversas.get(session_id)
+    if conversa is None:
+        conversa = conversas[session_id] = Conversa()
+        while len(conversas) > MAX_SESSIONS:
+            conversas.popitem(last=False)
+    else:
+        conversas.move_to_end(session_id)
+    return conversa
+
+def memoria_sessoes() -> Dict:
+    """Memória por sessão e total (strings compartilhadas contadas uma única vez no total)"""
+    vistos = set()
+    total_bytes = sum(conversa.memoria(vistos) for conversa in conversas.values())
+    compressoes = [conversa.compressao() for conversa in conversas.values()]
+    original = sum(c["original_bytes"] for c in compressoes)
+    comprimido = sum(c["compressed_bytes"] for c in compressoes)
+    return {
+        "total_bytes": total_bytes,
+        "sessions_bytes": {session_id: conversa.memoria() for session_id, conversa in conversas.items()},
+        "history_compression": {
+            "cold_messages": sum(c["cold_messages"] for c in compressoes),
+            "ratio": round(original / comprimido, 2) if comprimido else None,
+            "saved_bytes": sum(c["saved_bytes"] for c in compressoes)
+        }
+    }
@@ -0,0 +1,68 @@
+"""
+Configurações da aplicação, lidas do ambiente (.env) e validadas uma única vez
+"""
+
+import os
+from typing import List, Literal
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field, ValidationError, model_validator
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+class Settings(BaseModel):
+    """Configurações tipadas; valores fora da faixa impedem a inicialização"""
+    model_name: str = Field("gpt-3.5-turbo", min_length=1)
+    temperature: float = Field(0.7, ge=0, le=2)
+    max_tokens: int = Field(1000, ge=1)
+    # Prazo de uma requisição de chat (fila + chamada ao LLM), em segundos
+    request_timeout: float = Field(30.0, gt=0)
+    max_sessions: int = Field(100, ge=1)
+    max_history_messages: int = Field(50, ge=2)
+    # Mensagens recentes guardadas como objetos (o resto vai para blocos comprimidos)
+    hot_history_messages: int = Field(20, ge=1)
+    history_block_messages: int = Field(10, ge=1)
+    # Motor usado quando nem a requisição nem a sessão escolhem um
+    default_engine: Literal["openai", "local", "auto"] = "auto"
+    # Modelos aceitos em "model" por requisição (o padrão sempre é aceito)
+    allowed_models: List[str] = Field(default_factory=list)
+    # Janela (segundos) em que a mesma mensagem reenviada na sessão reaproveita a resposta; 0 desliga
+    turn_coalesce_window: float = Field(0.0, ge=0)
+    # Liga o tracemalloc e o endpoint /debug/memory
+    debug_memory: bool = False
+
+    @model_validator(mode="after")
+    def incluir_modelo_padrao(self) -> "Settings":
+        if self.model_name not in self.allowed_models:
+            self.allowed_models.insert(0, self.model_name)
+        return self
+
+# Variável de ambiente de cada campo
+ENV_VARS = {
+    "model_name": "MODEL_NAME",
+    "temperature": "TEMPERATURE",
+    "max_tokens": "MAX_TOKENS",
+    "request_timeout": "REQUEST_TIMEOUT",
+    "max_sessions": "MAX_SESSIONS",
+    "max_history_messages": "MAX_HISTORY_MESSAGES",
+    "hot_history_messages": "HOT_HISTORY_MESSAGES",
+    "history_block_messages": "HISTORY_BLOCK_MESSAGES",
+    "default_engine": "DEFAULT_ENGINE",
+    "allowed_models": "ALLOWED_MODELS",
+    "turn_coalesce_window": "TURN_COALESCE_WINDOW",
+    "debug_memory": "DEBUG_MEMORY",
+}
+
+def load_settings() -> Settings:
+    """Ler e validar as configurações (variáveis vazias ou ausentes usam o padrão)"""
+    valores = {campo: os.getenv(var) for campo, var in ENV_VARS.items() if os.getenv(var)}
+    if "allowed_models" in valores:
+        valores["allowed_models"] = [m.strip() for m in valores["allowed_models"].split(",") if m.strip()]
+
+    try:
+        return Settings(**valores)
+    except ValidationError as e:
+        raise RuntimeError(f"Configuração inválida no ambiente/.env:\n{e}") from e
+
+settings = load_settings()
@@ -1,96 +1,199 @@
 #!/usr/bin/env python3
 """
 Cliente inteligente que detecta automaticamente qual API usar
-- Tenta OpenAI primeiro (porta 8000)
-- Se falhar, usa chat local (porta 8001)
+- Tenta o servidor unificado (porta 8000): motor OpenAI se configurado, senão o local
+- Se o servidor não responder, usa chat local (porta 8001)
 """
 
 import requests
 import json
+import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
+from client import (CONNECT_TIMEOUT, MAX_RETRIES, POOL_SIZE, READ_TIMEOUT, ChatSocket, ChatSocketClosed, ChatSocketError,
+                    create_http_session)
+
+# Resultado de /health é reaproveitado por alguns segundos
+HEALTH_CACHE_TTL = 5.0
+# Espera pelo servidor local iniciado em subprocesso
+STARTUP_TIMEOUT = 15.0
+STARTUP_POLL_INTERVAL = 0.05
+STARTUP_POLL_MAX_INTERVAL = 1.0
+# "URL" usada quando o motor local roda dentro do próprio cliente
+EMBEDDED_URL = "embedded://local"
 
 class SmartChatClient:
-    def __init__(self):
+    def __init__(self, pool_size: int = POOL_SIZE, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, retries: int = MAX_RETRIES,
+                 embedded_local: bool = False, use_websocket: bool = True):
         self.openai_url = "http://localhost:8000"
         self.local_url = "http://localhost:8001"
         self.current_url = None
+        # Motor pedido ao servidor; None deixa o servidor escolher ("auto")
+        self.engine: Optional[str] = None
         self.session_id = f"smart_session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.http = create_http_session(pool_size, retries)
+        # Verificações de saúde não repetem: API fora do ar deve falhar rápido
+        self.probe_http = create_http_session(pool_size, retries=0)
+        self.timeout = (connect_timeout, read_timeout)
+        # Usar o motor local no próprio processo em vez de subir um servidor
+        self.embedded_local = embedded_local
+        self.health_cache: Dict[str, Tuple[float, Optional[dict]]] = {}
+        self.local_process: Optional[subprocess.Popen] = None
+        self.use_websocket = use_websocket
+        self.socket: Optional[ChatSocket] = None
+    
+    def use_api(self, url: Optional[str], engine: Optional[str] = None):
+        """Passar a usar a API em `url` (com o motor `engine`), abrindo o canal WebSocket quando houver"""
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+        self.current_url = url
+        self.engine = engine
+        if url and url != EMBEDDED_URL and self.use_websocket:
+            self.socket = ChatSocket.open(url, self.session_id, *self.timeout, engine=engine)
+    
+    def probe_health(self, url: str, use_cache: bool = True) -> Optional[dict]:
+        """Consultar /health (com cache); None se a API não responder"""
+        cached = self.health_cache.get(url)
+        if use_cache and cached and time.monotonic() - cached[0] < HEALTH_CACHE_TTL:
+            return cached[1]
         
-    def detect_available_api(self) -> str:
-        """Detectar qual API está disponível e funcionando"""
-        
-        # Testar OpenAI API primeiro
         try:
-            response = requests.get(f"{self.openai_url}/health", timeout=3)
-            if response.status_code == 200:
-                data = response.json()
-                # Verificar se OpenAI está configurada
-                if data.get('openai_configured'):
-                    print("🤖 Detectado: API OpenAI disponível e configurada")
-                    return self.openai_url
-                else:
-                    print("⚠️  API OpenAI disponível mas não configurada")
-        except requests.exceptions.RequestException:
+            response = self.probe_http.get(f"{url}/health", timeout=3)
+            data = response.json() if response.status_code == 200 else None
+        except (requests.exceptions.RequestException, ValueError):
+            data = None
+        
+        self.health_cache[url] = (time.monotonic(), data)
+        return data
+    
+    def probe_all(self, use_cache: bool = True) -> Tuple[Optional[dict], Optional[dict]]:
+        """Consultar as duas APIs em paralelo: (openai, local)"""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            openai = executor.submit(self.probe_health, self.openai_url, use_cache)
+            local = executor.submit(self.probe_health, self.local_url, use_cache)
+            return openai.result(), local.result()
+    
+    @staticmethod
+    def has_local_engine(health: Optional[dict]) -> bool:
+        """Servidor unificado com o motor local disponível"""
+        return bool(health and health.get('engines', {}).get('local'))
+    
+    def detect_available_api(self) -> Tuple[Optional[str], Optional[str]]:
+        """Detectar qual API (e motor) está disponível e funcionando: (url, engine)"""
+        openai_health, local_health = self.probe_all()
+        
+        # OpenAI tem prioridade
+        if openai_health is not None:
+            # Verificar se OpenAI está configurada
+            if openai_health.get('openai_configured'):
+                print("🤖 Detectado: API OpenAI disponível e configurada")
+                return self.openai_url, None
+            print("⚠️  API OpenAI disponível mas não configurada")
+            # Mesmo servidor atende com o motor local: um processo só
+            if self.has_local_engine(openai_health):
+                print("🏠 Detectado: motor local no mesmo servidor")
+                return self.openai_url, "local"
+        else:
             print("❌ API OpenAI não disponível")
         
-        # Testar API local
-        try:
-            response = requests.get(f"{self.local_url}/health", timeout=3)
-            if response.status_code == 200:
-                print("🏠 Detectado: Chat local disponível")
-                return self.local_url
-        except requests.exceptions.RequestException:
-            print("❌ Chat local não disponível")
+        if local_health is not None:
+            print("🏠 Detectado: Chat local disponível")
+            return self.local_url, "local"
+        print("❌ Chat local não disponível")
         
-        return None
+        if self.embedded_local:
+            print("🏠 Usando chat local embutido no cliente")
+            return EMBEDDED_URL, "local"
+        
+        return None, None
+    
+    def wait_until_ready(self, url: str, timeout: float = STARTUP_TIMEOUT) -> bool:
+        """Aguardar /health responder, com intervalo crescente entre tentativas"""
+        deadline = time.monotonic() + timeout
+        interval = STARTUP_POLL_INTERVAL
+        
+        while time.monotonic() < deadline:
+            if self.probe_health(url, use_cache=False) is not None:
+                return True
+            # Processo terminou antes de ficar pronto: não adianta esperar
+            if self.local_process and self.local_process.poll() is not None:
+                return False
+            time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+            interval = min(interval * 2, STARTUP_POLL_MAX_INTERVAL)
+        
+        return False
     
     def start_local_server(self):
         """Iniciar servidor local automaticamente"""
         print("🚀 Tentando iniciar chat local...")
-        import subprocess
-        import time
         
         try:
-            # Iniciar servidor local em background
-            subprocess.Popen([
+            # Iniciar servidor local em background (saída descartada: pipes
+            # nunca lidos enchem e travam o servidor)
+            self.local_process = subprocess.Popen([
                 'poetry', 'run', 'python', 'local_chat.py'
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            # Aguardar servidor iniciar
-            time.sleep(3)
+            ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             
-            # Testar se funcionou
-            try:
-                response = requests.get(f"{self.local_url}/health", timeout=3)
-                if response.status_code == 200:
-                    print("✅ Chat local iniciado com sucesso!")
-                    return True
-            except:
-                pass
+            if self.wait_until_ready(self.local_url):
+                print("✅ Chat local iniciado com sucesso!")
+                return True
                 
         except Exception as e:
             print(f"❌ Erro ao iniciar chat local: {e}")
         
         return False
     
-    def send_message(self, message: str) -> Optional[str]:
+    def send_embedded(self, message: str) -> str:
+        """Responder com o motor local no próprio processo"""
+        from local_chat import gerar_resposta_local
+        return gerar_resposta_local(message, self.session_id)
+    
+    def handle_api_error(self, error_msg: str, message: str) -> Optional[str]:
+        """Tratar erro da API; em caso de quota da OpenAI, repetir no chat local"""
+        if 'quota' in error_msg.lower() or '429' in error_msg:
+            print("⚠️  Quota OpenAI excedida. Tentando chat local...")
+            if self.fallback_to_local():
+                return self.send_message(message)
+        
+        print(f"❌ Erro da API: {error_msg}")
+        return None
+    
+    def send_message(self, message: str, on_chunk: Optional[Callable[[str], None]] = None) -> Optional[str]:
         """Enviar mensagem para a API disponível"""
         if not self.current_url:
             print("❌ Nenhuma API disponível")
             return None
+        
+        if self.current_url == EMBEDDED_URL:
+            return self.send_embedded(message)
+        
+        if self.socket:
+            try:
+                return self.socket.send_message(message, on_chunk)
+            except ChatSocketClosed:
+                self.socket = None  # Canal caiu antes do envio: seguir por HTTP
+            except ChatSocketError as e:
+                if self.socket.closed:
+                    self.socket = None
+                return self.handle_api_error(str(e), message)
             
         try:
             payload = {
                 "message": message,
                 "session_id": self.session_id
             }
+            if self.engine:
+                payload["engine"] = self.engine
             
-            response = requests.post(
+            response = self.http.post(
                 f"{self.current_url}/chat",
                 json=payload,
-                timeout=30
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
@@ -98,16 +201,7 @@ class SmartChatClient:
                 return data["response"]
             elif response.status_code == 500:
                 error_data = response.json()
-                error_msg = error_data.get('detail', '')
-                
-                # Se for erro de quota da OpenAI, tentar local
-                if 'quota' in error_msg.lower() or '429' in error_msg:
-                    print("⚠️  Quota OpenAI excedida. Tentando chat local...")
-                    if self.fallback_to_local():
-                        return self.send_message(message)
-                    
-                print(f"❌ Erro da API: {error_msg}")
-                return None
+                return self.handle_api_error(error_data.get('detail', ''), message)
             else:
                 print(f"❌ Status HTTP: {response.status_code}")
                 return None
@@ -120,19 +214,28 @@ class SmartChatClient:
         """Tentar usar chat local como fallback"""
         print("🔄 Mudando para chat local...")
         
-        # Verificar se local está disponível
-        try:
-            response = requests.get(f"{self.local_url}/health", timeout=3)
-            if response.status_code == 200:
-                self.current_url = self.local_url
-                print("✅ Conectado ao chat local")
+        # Servidor atual também tem o motor local: só trocar o motor (histórico mantido)
+        if self.current_url not in (None, EMBEDDED_URL, self.local_url) and self.engine != "local":
+            if self.has_local_engine(self.probe_health(self.current_url)):
+                self.use_api(self.current_url, "local")
+                print("✅ Usando o motor local do mesmo servidor")
                 return True
-        except:
-            pass
+        
+        # Verificar se local está disponível
+        if self.probe_health(self.local_url) is not None:
+            self.use_api(self.local_url, "local")
+            print("✅ Conectado ao chat local")
+            return True
+        
+        # Motor embutido: troca imediata, sem subprocesso
+        if self.embedded_local:
+            self.use_api(EMBEDDED_URL, "local")
+            print("✅ Usando chat local embutido")
+            return True
         
         # Tentar iniciar servidor local
         if self.start_local_server():
-            self.current_url = self.local_url
+            self.use_api(self.local_url, "local")
             return True
         
         print("❌ Não foi possível conectar ao chat local")
@@ -145,18 +248,23 @@ class SmartChatClient:
         print("=" * 60)
         
         # Detectar API disponível
-        self.current_url = self.detect_available_api()
+        self.use_api(*self.detect_available_api())
         
         if not self.current_url:
             print("❌ Nenhuma API disponível.")
             print("\n💡 Para resolver:")
-            print("   1. Para OpenAI: poetry run uvicorn main:app --reload")
-            print("   2. Para local: poetry run python local_chat.py")
+            print("   1. Servidor unificado: poetry run uvicorn main:app --reload")
+            print("   2. Só o motor local: poetry run python local_chat.py")
             return
         
-        api_type = "OpenAI" if self.current_url == self.openai_url else "Local"
+        if self.current_url == EMBEDDED_URL:
+            api_type = "Local (embutida)"
+        else:
+            api_type = "Local" if self.engine == "local" else "OpenAI"
         print(f"🎯 Usando: {api_type} API")
         print(f"📱 Sessão: {self.session_id}")
+        if self.socket:
+            print("⚡ Canal WebSocket ativo")
         print("💡 Digite /quit para sair")
         print("=" * 60)
         
@@ -171,12 +279,15 @@ class SmartChatClient:
                     print("\n👋 Até logo! Boa viagem!")
                     break
                 
-                # Enviar mensagem
+                # Enviar mensagem (partes em streaming já são impressas)
                 print("🤖 Assistente: ", end="", flush=True)
-                response = self.send_message(user_input)
+                streamed = []
+                response = self.send_message(user_input, on_chunk=lambda chunk: (
+                    streamed.append(chunk), print(chunk, end="", flush=True)
+                ))
                 
                 if response:
-                    print(response)
+                    print() if streamed else print(response)
                 else:
                     print("❌ Erro ao processar mensagem.")
                     
@@ -190,36 +301,32 @@ class SmartChatClient:
     def show_status(self):
         """Mostrar status das APIs"""
         print("\n🔍 STATUS DAS APIs:")
+        openai_health, local_health = self.probe_all(use_cache=False)
         
-        # Testar OpenAI
-        try:
-            response = requests.get(f"{self.openai_url}/health", timeout=3)
-            if response.status_code == 200:
-                data = response.json()
-                status = "✅ Online"
-                if not data.get('openai_configured'):
-                    status += " (sem OpenAI key)"
-                print(f"   OpenAI API: {status}")
-            else:
-                print(f"   OpenAI API: ❌ Error {response.status_code}")
-        except:
+        # OpenAI
+        if openai_health is not None:
+            status = "✅ Online"
+            if not openai_health.get('openai_configured'):
+                status += " (sem OpenAI key)"
+            if self.has_local_engine(openai_health):
+                status += " + motor local"
+            print(f"   OpenAI API: {status}")
+        else:
             print("   OpenAI API: ❌ Offline")
         
-        # Testar Local
-        try:
-            response = requests.get(f"{self.local_url}/health", timeout=3)
-            if response.status_code == 200:
-                print("   Local API:  ✅ Online")
-            else:
-                print(f"   Local API:  ❌ Error {response.status_code}")
-        except:
+        # Local
+        if local_health is not None:
+            print("   Local API:  ✅ Online")
+        else:
             print("   Local API:  ❌ Offline")
 
 def main():
     """Função principal"""
-    client = SmartChatClient()
+    args = sys.argv[1:]
+    # --embedded: usar o motor local dentro do cliente quando não houver servidor
+    client = SmartChatClient(embedded_local="--embedded" in args)
     
-    if len(sys.argv) > 1 and sys.argv[1] == "status":
+    if "status" in args:
         client.show_status()
     else:
         client.interactive_chat()
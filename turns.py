@@ -0,0 +1,116 @@
+"""
+Serialização dos turnos por sessão
+- Turnos da mesma sessão rodam um de cada vez (o prompt sempre vê o histórico completo)
+- Sessões diferentes continuam em paralelo
+- Um lock por sessão com turno em andamento; sai da memória quando o último turno termina
+- Opcional (TURN_COALESCE_WINDOW > 0): a mesma mensagem reenviada na mesma sessão
+  (duplo clique, duas abas) recebe a resposta do primeiro envio em vez de gerar outra
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, Tuple
+
+from settings import settings
+
+TURN_COALESCE_WINDOW = settings.turn_coalesce_window
+
+class _SessionLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Turnos usando ou aguardando o lock; em 0 a entrada é removida
+        self.users = 0
+
+class _SharedTurn:
+    """Turno em andamento (ou recém-concluído) compartilhado por envios repetidos"""
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SessionTurns:
+    def __init__(self, coalesce_window: float = TURN_COALESCE_WINDOW):
+        self.coalesce_window = coalesce_window
+        self._locks: Dict[str, _SessionLock] = {}
+        self._shared: Dict[Tuple[str, str, Hashable], _SharedTurn] = {}
+        self.counters = {"turns": 0, "waited": 0, "coalesced": 0}
+
+    @asynccontextmanager
+    async def lock(self, session_id: str) -> AsyncIterator[None]:
+        """Ocupar a vez da sessão até o fim do bloco"""
+        entrada = self._locks.get(session_id)
+        if entrada is None:
+            entrada = self._locks[session_id] = _SessionLock()
+        entrada.users += 1
+        try:
+            if entrada.lock.locked():
+                self.counters["waited"] += 1
+            async with entrada.lock:
+                self.counters["turns"] += 1
+                yield
+        finally:
+            entrada.users -= 1
+            if entrada.users == 0:
+                del self._locks[session_id]
+
+    async def run(self, session_id: str, message: str, turno: Callable[[], Awaitable[str]],
+                  extra_key: Hashable = ()) -> str:
+        """Executar `turno()` na vez da sessão, juntando reenvios idênticos se configurado
+
+        `extra_key` distingue envios com a mesma mensagem mas opções diferentes.
+        """
+        if self.coalesce_window <= 0:
+            async with self.lock(session_id):
+                return await turno()
+
+        chave = (session_id, message, extra_key)
+        compartilhado = self._shared.get(chave)
+        if compartilhado is None:
+            compartilhado = self._shared[chave] = _SharedTurn(asyncio.ensure_future(self._executar(session_id, turno)))
+            compartilhado.task.add_done_callback(lambda _: self._expirar(chave, compartilhado))
+        else:
+            self.counters["coalesced"] += 1
+
+        compartilhado.waiters += 1
+        try:
+            return await asyncio.shield(compartilhado.task)
+        except asyncio.CancelledError:
+            # Ninguém mais esperando: cancelar o turno (e a chamada ao LLM)
+            if compartilhado.waiters == 1 and not compartilhado.task.done():
+                compartilhado.task.cancel()
+            raise
+        finally:
+            compartilhado.waiters -= 1
+
+    async def _executar(self, session_id: str, turno: Callable[[], Awaitable[str]]) -> str:
+        async with self.lock(session_id):
+            return await turno()
+
+    def _expirar(self, chave, compartilhado: _SharedTurn):
+        """Manter o resultado por coalesce_window segundos para reenvios tardios"""
+        def remover():
+            if self._shared.get(chave) is compartilhado:
+                del self._shared[chave]
+
+        if compartilhado.task.cancelled() or compartilhado.task.exception() is not None:
+            remover()  # Falha não é reaproveitada: o próximo envio tenta de novo
+        else:
+            asyncio.get_running_loop().call_later(self.coalesce_window, remover)
+
+    async def stream(self, session_id: str, partes: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Repassar uma resposta em partes ocupando a vez da sessão"""
+        async with self.lock(session_id):
+            async for parte in partes:
+                yield parte
+
+    def stats(self) -> Dict:
+        return {
+            "active_session_locks": len(self._locks),
+            "waiting_turns": sum(entrada.users - 1 for entrada in self._locks.values() if entrada.lock.locked()),
+            "coalesce_window": self.coalesce_window,
+            "shared_turns": len(self._shared),
+            **self.counters
+        }
@@ -0,0 +1,104 @@
+"""
+Canal WebSocket de chat (/ws/chat) do servidor unificado (main.py)
+
+Protocolo (mensagens JSON):
+- cliente -> servidor: {"message": "..."}
+- servidor -> cliente:
+    {"type": "session", "session_id": ...}                      ao conectar
+    {"type": "chunk", "content": ...}                           partes da resposta (streaming)
+    {"type": "response", "response": ..., "session_id": ..., "model_used": ...}
+    {"type": "error", "detail": ...}
+    {"type": "heartbeat"}                                       a cada WS_HEARTBEAT_INTERVAL
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Callable, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+# Intervalo entre heartbeats enviados ao cliente (segundos)
+WS_HEARTBEAT_INTERVAL = 20.0
+# Mensagens aguardando processamento por conexão; acima disso o cliente é avisado
+WS_MAX_PENDING = 4
+
+# responder(mensagem, session_id) -> (modelo que vai responder, partes da resposta)
+Responder = Callable[[str, str], Tuple[str, AsyncIterator[str]]]
+
+async def serve_chat_socket(websocket: WebSocket, responder: Responder):
+    """Atender uma conexão: sessão fixa, mensagens processadas em ordem"""
+    session_id = websocket.query_params.get("session_id") or "default_session"
+    await websocket.accept()
+
+    envio = asyncio.Lock()
+
+    async def enviar(dados: dict):
+        async with envio:
+            await websocket.send_text(json.dumps(dados, ensure_ascii=False))
+
+    await enviar({"type": "session", "session_id": session_id})
+
+    pendentes: asyncio.Queue = asyncio.Queue(maxsize=WS_MAX_PENDING)
+    tarefas = [
+        asyncio.create_task(_receber(websocket, pendentes, enviar)),
+        asyncio.create_task(_processar(pendentes, enviar, responder, session_id)),
+        asyncio.create_task(_heartbeat(enviar)),
+    ]
+
+    try:
+        await asyncio.wait(tarefas, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+
+async def _receber(websocket: WebSocket, pendentes: asyncio.Queue, enviar):
+    """Ler mensagens do cliente; com a fila cheia, recusar em vez de acumular"""
+    try:
+        while True:
+            texto = await websocket.receive_text()
+            try:
+                mensagem = json.loads(texto).get("message")
+            except (ValueError, AttributeError):
+                mensagem = None
+
+            if not isinstance(mensagem, str) or not mensagem.strip():
+                await enviar({"type": "error", "detail": "Envie {\"message\": \"...\"}"})
+                continue
+
+            try:
+                pendentes.put_nowait(mensagem)
+            except asyncio.QueueFull:
+                await enviar({"type": "error", "detail": "Muitas mensagens pendentes; aguarde as respostas"})
+    except WebSocketDisconnect:
+        return
+
+async def _processar(pendentes: asyncio.Queue, enviar, responder: Responder, session_id: str):
+    """Gerar respostas uma a uma, repassando as partes conforme chegam"""
+    while True:
+        mensagem = await pendentes.get()
+        partes = []
+        try:
+            model_used, respostas = responder(mensagem, session_id)
+            async for parte in respostas:
+                partes.append(parte)
+                # Resposta em uma única parte não precisa de streaming
+                if len(partes) == 2:
+                    await enviar({"type": "chunk", "content": partes[0]})
+                if len(partes) >= 2:
+                    await enviar({"type": "chunk", "content": parte})
+        except Exception as e:
+            await enviar({"type": "error", "detail": f"Erro no processamento: {str(e)}"})
+            continue
+
+        await enviar({
+            "type": "response",
+            "response": "".join(partes),
+            "session_id": session_id,
+            "model_used": model_used
+        })
+
+async def _heartbeat(enviar):
+    while True:
+        await asyncio.sleep(WS_HEARTBEAT_INTERVAL)
+        await enviar({"type": "heartbeat"})